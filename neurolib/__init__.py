@@ -0,0 +1 @@
+from .utils.warmup import warmup
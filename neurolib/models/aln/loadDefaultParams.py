@@ -34,6 +34,18 @@ def loadDefaultParams(Cmat=None, Dmat=None, lookupTableFileName=None, seed=None)
     np.random.seed(seed)  # seed for RNG of noise and ICs
     params.seed = seed
 
+    # abort the integration if the state is not finite or larger than `divergence_threshold`,
+    # checked every `divergence_check_every` time steps (0: never)
+    params.divergence_check_every = 1000
+    params.divergence_threshold = 1e20
+
+    # number of threads to integrate the nodes in parallel, pays off for large networks only
+    params.n_threads = 1
+
+    # integrate the BOLD model along with the model (with `run(bold=True)`), only the BOLD samples are
+    # recorded and the outputs of the model can be sampled with `sampling_dt`
+    params.fused_bold = False
+
     # options
     params.warn = 0  # warn if limits of lookup tables are exceeded
     params.dosc_version = 0  # if 0, use exponential fit to linear response function
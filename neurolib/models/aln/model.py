@@ -52,6 +52,12 @@ class ALNModel(Model):
     default_output = "rates_exc"
     input_vars = ["ext_exc_current", "ext_exc_rate"]
     default_input = "ext_exc_rate"
+    # the integration only records every `sample_every`-th time step
+    integrationSubsampling = True
+    # the noise is drawn from counter-based random streams during the integration
+    counterNoise = True
+    # the BOLD model can be integrated along with the model
+    integrationBold = True
 
     def __init__(self, params=None, Cmat=None, Dmat=None, lookupTableFileName=None, seed=None):
         """
@@ -70,6 +76,9 @@ class ALNModel(Model):
         self.seed = seed  # Random seed
 
         integration = ti.timeIntegration
+        # arguments and kernel of the integration for batched runs
+        self.integrationArgs = ti.timeIntegration_args
+        self.integrationKernel = ti.timeIntegration_njit_elementwise
 
         # load default parameters if none were given
         if params is None:
@@ -2,14 +2,17 @@ import numpy as np
 import numba
 
 from . import loadDefaultParams as dp
+from ..bold import timeIntegration as bold
+from ...utils import batch, rng, sparse
 
 
-def timeIntegration(params):
-    """Sets up the parameters for time integration
-    
+def timeIntegration(params, sample_every=1, boldModel=None):
+    """Sets up the parameters for time integration and integrates the model
+
     Return:
       rates_exc:  N*L array   : containing the exc. neuron rates in kHz time series of the N nodes
       rates_inh:  N*L array   : containing the inh. neuron rates in kHz time series of the N nodes
+      (the first startind columns of the N*L arrays contain the last state, followed by the recorded time steps)
       t:          L array     : time in ms
       mufe:       N vector    : final value of mufe for each node
       mufi:       N vector    : final value of mufi for each node
@@ -25,9 +28,38 @@ def timeIntegration(params):
 
     :param params: Parameter dictionary of the model
     :type params: dict
+    :param sample_every: only record every `sample_every`-th time step in the outputs, defaults to 1
+    :type sample_every: int, optional
+    :param boldModel: integrate the BOLD model along with the model, only its samples are recorded,
+        defaults to None
+    :type boldModel: `neurolib.models.bold.BOLDModel`, optional
     :return: Integrated activity variables of the model
     :rtype: (numpy.ndarray,)
     """
+    # the nodes are integrated in parallel on `n_threads` threads
+    n_threads = params.get("n_threads", 1)
+    # the filtered sigmas are shared by all nodes, so they can't be integrated in parallel
+    if params["filter_sigma"]:
+        n_threads = 1
+    return batch.integrate(
+        timeIntegration_njit_elementwise, timeIntegration_args(params, sample_every, boldModel), n_threads
+    )
+
+
+def timeIntegration_args(params, sample_every=1, boldModel=None):
+    """Sets up the parameters for time integration and returns the arguments of
+    `timeIntegration_njit_elementwise`
+
+    :param params: Parameter dictionary of the model
+    :type params: dict
+    :param sample_every: only record every `sample_every`-th time step in the outputs, defaults to 1
+    :type sample_every: int, optional
+    :param boldModel: integrate the BOLD model along with the model, only its samples are recorded,
+        defaults to None
+    :type boldModel: `neurolib.models.bold.BOLDModel`, optional
+    :return: Arguments of the integration kernel
+    :rtype: tuple
+    """
 
     dt = params["dt"]  # Time step for the Euler intergration (ms)
     duration = params["duration"]  # imulation duration (ms)
@@ -59,6 +91,9 @@ def timeIntegration(params):
 
     Dmat_ndt = np.around(Dmat / dt).astype(int)  # delay matrix in multiples of dt
 
+    # if Cmat is sparse, only the nonzero afferent connections of every node are integrated
+    sparse_coupling, Cmat_indptr, Cmat_indices = sparse.afferents(Cmat)
+
     # ------------------------------------------------------------------------
 
     # local network (area) parameters [identical for all areas for now]
@@ -168,11 +203,20 @@ def timeIntegration(params):
     max_global_delay = max(np.max(Dmat_ndt), ndt_de, ndt_di)
     startind = int(max_global_delay + 1)
 
-    # state variable arrays, have length of t + startind
-    # they store initial conditions AND simulated data
-    rates_exc = np.zeros((N, startind + len(t)))
-    rates_inh = np.zeros((N, startind + len(t)))
-    IA = np.zeros((N, startind + len(t)))
+    # number of recorded time steps
+    n_samples = (len(t) + sample_every - 1) // sample_every
+
+    # output arrays, the first startind columns will hold the last state
+    rates_exc = np.zeros((N, startind + n_samples))
+    rates_inh = np.zeros((N, startind + n_samples))
+    IA = np.zeros((N, startind + n_samples))
+
+    # the history of the last startind + 1 time steps (needed for the delays) is kept in ring
+    # buffers, time step i is stored at index i % history_length
+    history_length = startind + 1
+    rates_exc_hist = np.zeros((N, history_length))
+    rates_inh_hist = np.zeros((N, history_length))
+    IA_hist = np.zeros((N, history_length))
 
     # ------------------------------------------------------------------------
     # Set initial values
@@ -205,29 +249,35 @@ def timeIntegration(params):
         rates_inh_init = params["rates_inh_init"][:, -startind:]
         IA_init = params["IA_init"][:, -startind:]
 
-    np.random.seed(RNGseed)
+    # the noise is drawn during the integration from counter-based random streams (one per node)
+    # that are indexed by the absolute time step, `noise_step` time steps were integrated before
+    noise_keys = rng.streamKeys(RNGseed, N)
+    noise_step = params.get("noise_step", 0)
 
-    # Save the noise in the rates array to save memory
-    rates_exc[:, startind:] = np.random.standard_normal((N, len(t)))
-    rates_inh[:, startind:] = np.random.standard_normal((N, len(t)))
+    # the integration is aborted if the state is not finite or exploded, checked every `check_every` time steps
+    check_every = params["divergence_check_every"]
+    divergence_threshold = params["divergence_threshold"]
 
     # Set the initial conditions
-    rates_exc[:, :startind] = rates_exc_init
-    rates_inh[:, :startind] = rates_inh_init
-    IA[:, :startind] = IA_init
+    rates_exc_hist[:, :startind] = rates_exc_init
+    rates_inh_hist[:, :startind] = rates_inh_init
+    IA_hist[:, :startind] = IA_init
 
     noise_exc = np.zeros((N,))
     noise_inh = np.zeros((N,))
 
     # tile external inputs to appropriate shape
-    ext_exc_current = adjust_shape(params["ext_exc_current"], rates_exc)
-    ext_inh_current = adjust_shape(params["ext_inh_current"], rates_exc)
-    ext_exc_rate = adjust_shape(params["ext_exc_rate"], rates_exc)
-    ext_inh_rate = adjust_shape(params["ext_inh_rate"], rates_exc)
+    ext_exc_current = adjust_shape(params["ext_exc_current"], (N, startind + len(t)))
+    ext_inh_current = adjust_shape(params["ext_inh_current"], (N, startind + len(t)))
+    ext_exc_rate = adjust_shape(params["ext_exc_rate"], (N, startind + len(t)))
+    ext_inh_rate = adjust_shape(params["ext_inh_rate"], (N, startind + len(t)))
 
     # ------------------------------------------------------------------------
 
-    return timeIntegration_njit_elementwise(
+    # the BOLD model is integrated along with the model and only its samples are recorded
+    bold_every, bold_phase, bold_dt, bold_state, BOLD = bold.fusedArgs(boldModel, N, len(t))
+
+    return (
         dt,
         duration,
         distr_delay,
@@ -274,6 +324,7 @@ def timeIntegration(params):
         mufe,
         mufi,
         IA,
+        IA_hist,
         seem,
         seim,
         seev,
@@ -292,9 +343,24 @@ def timeIntegration(params):
         Irange,
         N,
         Dmat_ndt,
+        sparse_coupling,
+        Cmat_indptr,
+        Cmat_indices,
         t,
         rates_exc,
         rates_inh,
+        rates_exc_hist,
+        rates_inh_hist,
+        noise_keys,
+        noise_step,
+        sample_every,
+        check_every,
+        divergence_threshold,
+        bold_every,
+        bold_phase,
+        bold_dt,
+        bold_state,
+        BOLD,
         rd_exc,
         rd_inh,
         sqrt_dt,
@@ -312,7 +378,11 @@ def timeIntegration(params):
     )
 
 
-@numba.njit(locals={"idxX": numba.int64, "idxY": numba.int64, "idx1": numba.int64, "idy1": numba.int64})
+@numba.njit(
+    nogil=True,
+    cache=True,
+    locals={"idxX": numba.int64, "idxY": numba.int64, "idx1": numba.int64, "idy1": numba.int64},
+)
 def timeIntegration_njit_elementwise(
     dt,
     duration,
@@ -360,6 +430,7 @@ def timeIntegration_njit_elementwise(
     mufe,
     mufi,
     IA,
+    IA_hist,
     seem,
     seim,
     seev,
@@ -378,9 +449,24 @@ def timeIntegration_njit_elementwise(
     Irange,
     N,
     Dmat_ndt,
+    sparse_coupling,
+    Cmat_indptr,
+    Cmat_indices,
     t,
     rates_exc,
     rates_inh,
+    rates_exc_hist,
+    rates_inh_hist,
+    noise_keys,
+    noise_step,
+    sample_every,
+    check_every,
+    divergence_threshold,
+    bold_every,
+    bold_phase,
+    bold_dt,
+    bold_state,
+    BOLD,
     rd_exc,
     rd_inh,
     sqrt_dt,
@@ -403,36 +489,57 @@ def timeIntegration_njit_elementwise(
     sq_Jie_max = Jie_max ** 2
     sq_Jii_max = Jii_max ** 2
 
-    # initialize so we don't get an error when returning
-    rd_exc_rhs = 0.0
-    rd_inh_rhs = 0.0
-    sigmae_f_rhs = 0.0
-    sigmai_f_rhs = 0.0
+    # the filtered sigmas are shared by all nodes
+    sigmas_f = np.array([sigmae_ext, sigmai_ext])
 
-    if filter_sigma:
-        sigmae_f = sigmae_ext
-        sigmai_f = sigmai_ext
+    # length of the ring buffers
+    n_hist = rates_exc_hist.shape[1]
+    # index of the next recorded time step in the outputs
+    s = startind
+    # index of the next BOLD sample
+    s_bold = 0
 
     ### integrate ODE system:
+    # index after the last integrated time step
+    i_end = startind + len(t)
+
     for i in range(startind, startind + len(t)):
 
+        # index of the current time step in the ring buffers, the delayed time steps j - d - 1 < 0
+        # wrap around to the end of the ring buffers
+        j = i % n_hist
+
         if not distr_delay:
             # Get the input from one node into another from the rates at time t - connection_delay - 1
             # remark: assume Kie == Kee and Kei == Kii
-            for no in range(N):
+            for no in numba.prange(N):
                 # interareal coupling
-                for l in range(N):
-                    # rd_exc(i,j) delayed input rate from population j to population i
-                    rd_exc[l, no] = rates_exc[no, i - Dmat_ndt[l, no] - 1] * 1e-3  # convert Hz to kHz
+                if sparse_coupling:
+                    # only the delayed rates from the afferents of node no (and itself) are needed
+                    rd_exc[no, no] = rates_exc_hist[no, j - Dmat_ndt[no, no] - 1] * 1e-3  # convert Hz to kHz
+                    for k in range(Cmat_indptr[no], Cmat_indptr[no + 1]):
+                        l = Cmat_indices[k]
+                        rd_exc[no, l] = rates_exc_hist[l, j - Dmat_ndt[no, l] - 1] * 1e-3  # convert Hz to kHz
+                else:
+                    for l in range(N):
+                        # rd_exc(i,j) delayed input rate from population j to population i
+                        rd_exc[l, no] = rates_exc_hist[no, j - Dmat_ndt[l, no] - 1] * 1e-3  # convert Hz to kHz
                 # Warning: this is a vector and not a matrix as rd_exc
-                rd_inh[no] = rates_inh[no, i - ndt_di - 1] * 1e-3  # convert Hz to kHz
+                rd_inh[no] = rates_inh_hist[no, j - ndt_di - 1] * 1e-3  # convert Hz to kHz
 
         # loop through all the nodes
-        for no in range(N):
+        for no in numba.prange(N):
 
-            # To save memory, noise is saved in the rates array
-            noise_exc[no] = rates_exc[no, i]
-            noise_inh[no] = rates_inh[no, i]
+            # initialize in every iteration, only used with `filter_sigma` or `distr_delay`
+            rd_exc_rhs = 0.0
+            rd_inh_rhs = 0.0
+            sigmae_f_rhs = 0.0
+            sigmai_f_rhs = 0.0
+            tau_sigmae_eff = 0.0
+            tau_sigmai_eff = 0.0
+
+            # noise of the current time step
+            noise_exc[no], noise_inh[no] = rng.normals(noise_keys[no], noise_step + i - startind)
 
             mue = Jee_max * seem[no] + Jei_max * seim[no] + mue_ou[no] + ext_exc_current[no, i]
             mui = Jie_max * siem[no] + Jii_max * siim[no] + mui_ou[no] + ext_inh_current[no, i]
@@ -440,9 +547,15 @@ def timeIntegration_njit_elementwise(
             # compute row sum of Cmat*rd_exc and Cmat**2*rd_exc
             rowsum = 0
             rowsumsq = 0
-            for col in range(N):
-                rowsum = rowsum + Cmat[no, col] * rd_exc[no, col]
-                rowsumsq = rowsumsq + Cmat[no, col] ** 2 * rd_exc[no, col]
+            if sparse_coupling:
+                for k in range(Cmat_indptr[no], Cmat_indptr[no + 1]):
+                    col = Cmat_indices[k]
+                    rowsum = rowsum + Cmat[no, col] * rd_exc[no, col]
+                    rowsumsq = rowsumsq + Cmat[no, col] ** 2 * rd_exc[no, col]
+            else:
+                for col in range(N):
+                    rowsum = rowsum + Cmat[no, col] * rd_exc[no, col]
+                    rowsumsq = rowsumsq + Cmat[no, col] ** 2 * rd_exc[no, col]
 
             # z1: weighted sum of delayed rates, weights=c*K
             z1ee = (
@@ -475,7 +588,10 @@ def timeIntegration_njit_elementwise(
                 + sigmai_ext ** 2
             )  # mV/sqrt(ms)
 
-            if not filter_sigma:
+            if filter_sigma:
+                sigmae_f = sigmas_f[0]
+                sigmai_f = sigmas_f[1]
+            else:
                 sigmae_f = sigmae
                 sigmai_f = sigmai
 
@@ -485,11 +601,11 @@ def timeIntegration_njit_elementwise(
             # ------- excitatory population
             # mufe[no] - IA[no] / C is the total current of the excitatory population
             xid1, yid1, dxid, dyid = fast_interp2_opt(
-                sigmarange, ds, sigmae_f, Irange, dI, mufe[no] - IA[no, i - 1] / C
+                sigmarange, ds, sigmae_f, Irange, dI, mufe[no] - IA_hist[no, j - 1] / C
             )
             xid1, yid1 = int(xid1), int(yid1)
 
-            rates_exc[no, i] = interpolate_values(precalc_r, xid1, yid1, dxid, dyid) * 1e3  # convert kHz to Hz
+            rates_exc_hist[no, j] = interpolate_values(precalc_r, xid1, yid1, dxid, dyid) * 1e3  # convert kHz to Hz
             Vmean_exc = interpolate_values(precalc_V, xid1, yid1, dxid, dyid)
             tau_exc = interpolate_values(precalc_tau_mu, xid1, yid1, dxid, dyid)
             if filter_sigma:
@@ -500,7 +616,7 @@ def timeIntegration_njit_elementwise(
             xid1, yid1, dxid, dyid = fast_interp2_opt(sigmarange, ds, sigmai_f, Irange, dI, mufi[no])
             xid1, yid1 = int(xid1), int(yid1)
 
-            rates_inh[no, i] = interpolate_values(precalc_r, xid1, yid1, dxid, dyid) * 1e3
+            rates_inh_hist[no, j] = interpolate_values(precalc_r, xid1, yid1, dxid, dyid) * 1e3
             # Vmean_inh = interpolate_values(precalc_V, xid1, yid1, dxid, dyid) # not used
             tau_inh = interpolate_values(precalc_tau_mu, xid1, yid1, dxid, dyid)
             if filter_sigma:
@@ -514,12 +630,12 @@ def timeIntegration_njit_elementwise(
             mufi_rhs = (mui - mufi[no]) / tau_inh
 
             # rate has to be kHz
-            IA_rhs = (a * (Vmean_exc - EA) - IA[no, i - 1] + tauA * b * rates_exc[no, i] * 1e-3) / tauA
+            IA_rhs = (a * (Vmean_exc - EA) - IA_hist[no, j - 1] + tauA * b * rates_exc_hist[no, j] * 1e-3) / tauA
 
             # EQ. 4.43
             if distr_delay:
-                rd_exc_rhs = (rates_exc[no, i] * 1e-3 - rd_exc[no, no]) / tau_de
-                rd_inh_rhs = (rates_inh[no, i] * 1e-3 - rd_inh[no]) / tau_di
+                rd_exc_rhs = (rates_exc_hist[no, j] * 1e-3 - rd_exc[no, no]) / tau_de
+                rd_inh_rhs = (rates_inh_hist[no, j] * 1e-3 - rd_inh[no]) / tau_di
 
             if filter_sigma:
                 sigmae_f_rhs = (sigmae - sigmae_f) / tau_sigmae_eff
@@ -539,15 +655,15 @@ def timeIntegration_njit_elementwise(
 
             mufe[no] = mufe[no] + dt * mufe_rhs
             mufi[no] = mufi[no] + dt * mufi_rhs
-            IA[no, i] = IA[no, i - 1] + dt * IA_rhs
+            IA_hist[no, j] = IA_hist[no, j - 1] + dt * IA_rhs
 
             if distr_delay:
                 rd_exc[no, no] = rd_exc[no, no] + dt * rd_exc_rhs
                 rd_inh[no] = rd_inh[no] + dt * rd_inh_rhs
 
             if filter_sigma:
-                sigmae_f = sigmae_f + dt * sigmae_f_rhs
-                sigmai_f = sigmai_f + dt * sigmai_f_rhs
+                sigmas_f[0] = sigmae_f + dt * sigmae_f_rhs
+                sigmas_f[1] = sigmai_f + dt * sigmai_f_rhs
 
             seem[no] = seem[no] + dt * seem_rhs
             seim[no] = seim[no] + dt * seim_rhs
@@ -579,10 +695,65 @@ def timeIntegration_njit_elementwise(
                 mui_ou[no] + (mui_ext_mean - mui_ou[no]) * dt / tau_ou + sigma_ou * sqrt_dt * noise_inh[no]
             )  # mV/ms
 
-    return t, rates_exc, rates_inh, mufe, mufi, IA, seem, seim, siem, siim, seev, seiv, siev, siiv, mue_ou, mui_ou
+            # the BOLD model of the node is driven by its default output
+            if bold_every > 0:
+                bold.balloonWindkesselStep(bold_state, no, rates_exc_hist[no, j], bold_dt)
+
+        # only record every sample_every-th time step
+        if (i - startind) % sample_every == 0:
+            rates_exc[:, s] = rates_exc_hist[:, j]
+            rates_inh[:, s] = rates_inh_hist[:, j]
+            IA[:, s] = IA_hist[:, j]
+            s += 1
+
+        # record the BOLD signal every bold_every-th time step
+        if bold_every > 0 and (bold_phase + i - startind) % bold_every == 0:
+            for no in range(N):
+                BOLD[no, s_bold] = bold.boldSignal(bold_state, no)
+            s_bold += 1
+
+        # abort the integration if the state diverged, the remaining outputs are nan
+        if check_every > 0 and (i - startind) % check_every == 0:
+            if not (
+                np.all(np.abs(rates_exc_hist[:, j]) <= divergence_threshold)
+                and np.all(np.abs(rates_inh_hist[:, j]) <= divergence_threshold)
+            ):
+                rates_exc[:, s:] = np.nan
+                rates_inh[:, s:] = np.nan
+                IA[:, s:] = np.nan
+                BOLD[:, s_bold:] = np.nan
+                i_end = i + 1
+                break
+
+    # the last startind time steps are the initial state of the next run
+    for k in range(startind):
+        rates_exc[:, k] = rates_exc_hist[:, (i_end - startind + k) % n_hist]
+        rates_inh[:, k] = rates_inh_hist[:, (i_end - startind + k) % n_hist]
+        IA[:, k] = IA_hist[:, (i_end - startind + k) % n_hist]
+
+    return (
+        t,
+        rates_exc,
+        rates_inh,
+        mufe,
+        mufi,
+        IA,
+        seem,
+        seim,
+        siem,
+        siim,
+        seev,
+        seiv,
+        siev,
+        siiv,
+        mue_ou,
+        mui_ou,
+        BOLD,
+        bold_state,
+    )
 
 
-@numba.njit(locals={"idxX": numba.int64, "idxY": numba.int64})
+@numba.njit(cache=True, locals={"idxX": numba.int64, "idxY": numba.int64})
 def interpolate_values(table, xid1, yid1, dxid, dyid):
     output = (
         table[yid1, xid1] * (1 - dxid) * (1 - dyid)
@@ -593,7 +764,7 @@ def interpolate_values(table, xid1, yid1, dxid, dyid):
     return output
 
 
-@numba.njit(locals={"idxX": numba.int64, "idxY": numba.int64})
+@numba.njit(cache=True, locals={"idxX": numba.int64, "idxY": numba.int64})
 def lookup_no_interp(x, dx, xi, y, dy, yi):
 
     """
@@ -639,11 +810,13 @@ def lookup_no_interp(x, dx, xi, y, dy, yi):
 def adjust_shape(original, target):
     """
     Tiles and then cuts an array (or list or float) such that
-    it has the same shape as target at the end.
+    it has the same shape as target (an array or a shape tuple) at the end.
     This is used to make sure that any input parameter like external current has
     the same shape as the rate array.
     """
 
+    shape = target if isinstance(target, tuple) else target.shape
+
     # make an ext_exc_current ARRAY from a LIST or INT
     if not hasattr(original, "__len__"):
         original = [original]
@@ -656,9 +829,9 @@ def adjust_shape(original, target):
     # either (x,) shape or (y,x) shape
     if len(original.shape) == 1:
         # if original.shape[0] > 1:
-        rep_y = target.shape[0]
-    elif target.shape[0] > original.shape[0]:
-        rep_y = int(target.shape[0] / original.shape[0]) + 1
+        rep_y = shape[0]
+    elif shape[0] > original.shape[0]:
+        rep_y = int(shape[0] / original.shape[0]) + 1
     else:
         rep_y = 1
 
@@ -667,19 +840,19 @@ def adjust_shape(original, target):
 
     # tile until t
 
-    if target.shape[1] > original.shape[1]:
-        rep_x = int(target.shape[1] / original.shape[1]) + 1
+    if shape[1] > original.shape[1]:
+        rep_x = int(shape[1] / original.shape[1]) + 1
     else:
         rep_x = 1
     original = np.tile(original, (1, rep_x))
 
     # cut from end because the beginning can be initial condition
-    original = original[: target.shape[0], -target.shape[1] :]
+    original = original[: shape[0], -shape[1] :]
 
     return original
 
 
-@numba.njit(locals={"xid1": numba.int64, "yid1": numba.int64, "dxid": numba.float64, "dyid": numba.float64})
+@numba.njit(cache=True, locals={"xid1": numba.int64, "yid1": numba.int64, "dxid": numba.float64, "dyid": numba.float64})
 def fast_interp2_opt(x, dx, xi, y, dy, yi):
 
     """
@@ -1,6 +1,7 @@
 import numpy as np
 
 from .timeIntegration import simulateBOLD
+from ...utils.collections import GrowableArray
 
 
 class BOLDModel:
@@ -23,6 +24,9 @@ class BOLDModel:
         self.BOLD = np.array([], dtype="f", ndmin=2)
         self.all_Rates = np.array([], dtype="f", ndmin=2)
         self.BOLD_chunk = np.array([], dtype="f", ndmin=2)
+        # growable buffers for appended outputs
+        self.t_BOLD_buffer = None
+        self.BOLD_buffer = None
 
         self.idxLastT = 0  # Index of the last computed t
 
@@ -67,19 +71,67 @@ class BOLDModel:
             * self.dt
         )
 
+        self.storeSamples(t_BOLD_resampled, BOLD_resampled, append=append)
+
+        self.idxLastT = self.idxLastT + activity.shape[1]
+
+    def fusedArgs(self, n_steps):
+        """Arguments of the integration kernels of the models that integrate the BOLD model along with the
+        neural activity (see `neurolib.models.bold.timeIntegration.fusedArgs`). The kernels record the BOLD
+        signal at the same time steps as `run()`.
+
+        :param n_steps: number of time steps to integrate
+        :type n_steps: int
+        """
+        # the BOLD signal is recorded at every time step i of the chunk with (phase + i) % samplingRate_NDt == 0
+        phase = self.idxLastT - 1
+        n_samples = (phase + n_steps - 1) // self.samplingRate_NDt - (phase - 1) // self.samplingRate_NDt
+        state = np.stack([self.X_BOLD, self.F_BOLD, self.Q_BOLD, self.V_BOLD])
+        return self.samplingRate_NDt, phase, self.dt * 1e-3, state, np.zeros((self.N, n_samples))
+
+    def storeFused(self, BOLD, state, n_steps, append=False):
+        """Stores the BOLD samples and the state of the BOLD model that were integrated along with the
+        neural activity.
+
+        :param BOLD: BOLD samples of the chunk
+        :type BOLD: numpy.ndarray
+        :param state: state of the BOLD model (X, F, Q, V) after the chunk
+        :type state: numpy.ndarray
+        :param n_steps: number of integrated time steps
+        :type n_steps: int
+        :param append: append the samples to the previous ones, defaults to False
+        :type append: bool, optional
+        """
+        self.X_BOLD, self.F_BOLD, self.Q_BOLD, self.V_BOLD = state
+        first = (1 - self.idxLastT) % self.samplingRate_NDt
+        t_BOLD = (self.idxLastT + first + self.samplingRate_NDt * np.arange(BOLD.shape[1])) * self.dt
+        self.storeSamples(t_BOLD, BOLD, append=append)
+        self.idxLastT = self.idxLastT + n_steps
+
+    def storeSamples(self, t_BOLD, BOLD, append=False):
+        """Stores the downsampled BOLD signal of a chunk.
+
+        :param t_BOLD: time of the samples in ms
+        :type t_BOLD: numpy.ndarray
+        :param BOLD: BOLD samples
+        :type BOLD: numpy.ndarray
+        :param append: append the samples to the previous ones, defaults to False
+        :type append: bool, optional
+        """
         if self.BOLD.shape[1] == 0:
             # add new data
-            self.t_BOLD = t_BOLD_resampled
-            self.BOLD = BOLD_resampled
+            self.t_BOLD = t_BOLD
+            self.BOLD = BOLD
         elif append is True:
-            # append new data to old data
-            self.t_BOLD = np.hstack((self.t_BOLD, t_BOLD_resampled))
-            self.BOLD = np.hstack((self.BOLD, BOLD_resampled))
+            # append new data to old data, buffers are created with the first append
+            if self.BOLD_buffer is None or self.BOLD_buffer.data is not self.BOLD:
+                self.t_BOLD_buffer = GrowableArray(self.t_BOLD)
+                self.BOLD_buffer = GrowableArray(self.BOLD)
+            self.t_BOLD = self.t_BOLD_buffer.append(t_BOLD)
+            self.BOLD = self.BOLD_buffer.append(BOLD)
         else:
             # overwrite old data
-            self.t_BOLD = t_BOLD_resampled
-            self.BOLD = BOLD_resampled
-
-        self.BOLD_chunk = BOLD_resampled
+            self.t_BOLD = t_BOLD
+            self.BOLD = BOLD
 
-        self.idxLastT = self.idxLastT + activity.shape[1]
+        self.BOLD_chunk = BOLD
@@ -1,6 +1,20 @@
 import numpy as np
 import numba
 
+# Balloon-Windkessel model parameters (from Friston 2003), scalar values for each region's parameter,
+# see `simulateBOLD`
+RHO = 0.34  # Capillary resting net oxygen extraction (dimensionless), E_0 in Friston2000
+ALPHA = 0.32  # Grubb's vessel stiffness exponent (dimensionless), \alpha in Friston2000
+V0 = 0.02  # Resting blood volume fraction (dimensionless)
+K1 = 7 * RHO  # (dimensionless)
+K2 = 2.0  # (dimensionless)
+K3 = 2 * RHO - 0.2  # (dimensionless)
+GAMMA = 0.41  # Rate constant for autoregulatory feedback by blood flow (1/s)
+K = 0.65  # Vasodilatory signal decay (1/s)
+TAU = 0.98  # Transit time  (s)
+# epsilon for softening, see `integrateBOLD_numba`
+EPS = 1e-120
+
 
 def simulateBOLD(Z, dt, voxelCounts, X=None, F=None, Q=None, V=None):
     """Simulate BOLD activity using the Balloon-Windkessel model.
@@ -49,16 +63,10 @@ def simulateBOLD(Z, dt, voxelCounts, X=None, F=None, Q=None, V=None):
     # K       = np.random.normal(0.65 * np.ones(N), np.sqrt(0.015) * voxelCountsSqrtInv)   # Vasodilatory signal decay
     # Tau     = np.random.normal(0.98 * np.ones(N), np.sqrt(0.0568) * voxelCountsSqrtInv)   # Transit time
     #
-    # If no voxel counts are given, we can use scalar values for each region's parameter:
-    rho = 0.34  # Capillary resting net oxygen extraction (dimensionless), E_0 in Friston2000
-    alpha = 0.32  # Grubb's vessel stiffness exponent (dimensionless), \alpha in Friston2000
-    V0 = 0.02  # Resting blood volume fraction (dimensionless)
-    k1 = 7 * rho  # (dimensionless)
-    k2 = 2.0  # (dimensionless)
-    k3 = 2 * rho - 0.2  # (dimensionless)
-    Gamma = 0.41 * np.ones((N,))  # Rate constant for autoregulatory feedback by blood flow (1/s)
-    K = 0.65 * np.ones((N,))  # Vasodilatory signal decay (1/s)
-    Tau = 0.98 * np.ones((N,))  # Transit time  (s)
+    # If no voxel counts are given, we can use scalar values for each region's parameter (module constants)
+    Gamma = GAMMA * np.ones((N,))  # Rate constant for autoregulatory feedback by blood flow (1/s)
+    Kappa = K * np.ones((N,))  # Vasodilatory signal decay (1/s)
+    Tau = TAU * np.ones((N,))  # Transit time  (s)
 
     # initialize state variables
     # NOTE: We need to use np.copy() because these variables
@@ -70,12 +78,13 @@ def simulateBOLD(Z, dt, voxelCounts, X=None, F=None, Q=None, V=None):
     V = np.zeros((N,)) if V is None else np.copy(V)  # Blood volume
 
     BOLD = np.zeros(np.shape(Z))
-    # return integrateBOLD_numba(BOLD, X, Q, F, V, Z, dt, N, rho, alpha, V0, k1, k2, k3, Gamma, K, Tau)
-    BOLD, X, F, Q, V = integrateBOLD_numba(BOLD, X, Q, F, V, Z, dt, N, rho, alpha, V0, k1, k2, k3, Gamma, K, Tau)
+    BOLD, X, F, Q, V = integrateBOLD_numba(
+        BOLD, X, Q, F, V, Z, dt, N, RHO, ALPHA, V0, K1, K2, K3, Gamma, Kappa, Tau
+    )
     return BOLD, X, F, Q, V
 
 
-@numba.njit
+@numba.njit(cache=True)
 def integrateBOLD_numba(BOLD, X, Q, F, V, Z, dt, N, rho, alpha, V0, k1, k2, k3, Gamma, K, Tau):
     """Integrate the Balloon-Windkessel model.
 
@@ -108,3 +117,62 @@ def integrateBOLD_numba(BOLD, X, Q, F, V, Z, dt, N, rho, alpha, V0, k1, k2, k3,
 
             BOLD[j, i] = V0 * (k1 * (1 - Q[j]) + k2 * (1 - Q[j] / V[j]) + k3 * (1 - V[j]))
     return BOLD, X, F, Q, V
+
+
+def fusedArgs(boldModel, N, n_steps):
+    """Arguments of the integration kernels of the models that integrate the BOLD model along with the
+    neural activity. Without a BOLD model, the kernels don't integrate it.
+
+    :param boldModel: BOLD model to continue, or None
+    :type boldModel: `neurolib.models.bold.BOLDModel`
+    :param N: number of nodes
+    :type N: int
+    :param n_steps: number of time steps to integrate
+    :type n_steps: int
+    :return: time steps between two BOLD samples (0 if the BOLD model is not integrated), phase of the
+        samples, dt of the BOLD model (in s), state of the BOLD model (X, F, Q, V) and BOLD samples
+    :rtype: (int, int, float, numpy.ndarray, numpy.ndarray)
+    """
+    if boldModel is None:
+        return 0, 0, 0.0, np.ones((4, N)), np.zeros((N, 0))
+    return boldModel.fusedArgs(n_steps)
+
+
+@numba.njit(nogil=True, cache=True)
+def balloonWindkesselStep(state, no, z, dt):
+    """Integrates the Balloon-Windkessel model of a node for a single time step with the same
+    scheme as `integrateBOLD_numba`.
+
+    :param state: state of the BOLD model with rows X, F, Q, V and a column for each node
+    :type state: numpy.ndarray
+    :param no: index of the node
+    :type no: int
+    :param z: neural activity of the node in the time step
+    :type z: float
+    :param dt: time step in s
+    :type dt: float
+    """
+    X = state[0, no]
+    F = state[1, no]
+    Q = state[2, no]
+    V = state[3, no]
+    X = X + dt * (z - K * X - GAMMA * (F - 1))
+    state[2, no] = Q + dt / TAU * (F / RHO * (1 - (1 - RHO) ** (1 / F)) - Q * V ** (1 / ALPHA - 1))
+    state[3, no] = V + dt / TAU * (F - V ** (1 / ALPHA))
+    state[0, no] = X
+    state[1, no] = max(F + dt * X, EPS)
+
+
+@numba.njit(nogil=True, cache=True)
+def boldSignal(state, no):
+    """BOLD signal of a node, given the state of its Balloon-Windkessel model.
+
+    :param state: state of the BOLD model with rows X, F, Q, V and a column for each node
+    :type state: numpy.ndarray
+    :param no: index of the node
+    :type no: int
+    :rtype: float
+    """
+    Q = state[2, no]
+    V = state[3, no]
+    return V0 * (K1 * (1 - Q) + K2 * (1 - Q / V) + K3 * (1 - V))
@@ -26,6 +26,18 @@ def loadDefaultParams(Cmat=None, Dmat=None, seed=None):
     # set seed to 0 if None, pypet will complain otherwise
     params.seed = seed or 0
 
+    # abort the integration if the state is not finite or larger than `divergence_threshold`,
+    # checked every `divergence_check_every` time steps (0: never)
+    params.divergence_check_every = 1000
+    params.divergence_threshold = 1e20
+
+    # number of threads to integrate the nodes in parallel, pays off for large networks only
+    params.n_threads = 1
+
+    # integrate the BOLD model along with the model (with `run(bold=True)`), only the BOLD samples are
+    # recorded and the outputs of the model can be sampled with `sampling_dt`
+    params.fused_bold = False
+
     # make sure that seed=0 remains None
     if seed == 0:
         seed = None
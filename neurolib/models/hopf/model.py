@@ -17,6 +17,12 @@ class HopfModel(Model):
     default_output = "x"
     input_vars = ["x_ext", "y_ext"]
     default_input = "x_ext"
+    # the integration only records every `sample_every`-th time step
+    integrationSubsampling = True
+    # the noise is drawn from counter-based random streams during the integration
+    counterNoise = True
+    # the BOLD model can be integrated along with the model
+    integrationBold = True
 
     # because this is not a rate model, the input
     # to the bold model must be transformed
@@ -30,6 +36,9 @@ class HopfModel(Model):
 
         # the integration function must be passed
         integration = ti.timeIntegration
+        # arguments and kernel of the integration for batched runs
+        self.integrationArgs = ti.timeIntegration_args
+        self.integrationKernel = ti.timeIntegration_njit_elementwise
 
         # load default parameters if none were given
         if params is None:
@@ -2,16 +2,45 @@ import numpy as np
 import numba
 
 from . import loadDefaultParams as dp
+from ..bold import timeIntegration as bold
+from ...utils import batch, rng, sparse
 
 
-def timeIntegration(params):
-    """Sets up the parameters for time integration
-    
+def timeIntegration(params, sample_every=1, boldModel=None):
+    """Sets up the parameters for time integration and integrates the model
+
     :param params: Parameter dictionary of the model
     :type params: dict
-    :return: Integrated activity variables of the model
+    :param sample_every: only record every `sample_every`-th time step in the outputs, defaults to 1
+    :type sample_every: int, optional
+    :param boldModel: integrate the BOLD model along with the model, only its samples are recorded,
+        defaults to None
+    :type boldModel: `neurolib.models.bold.BOLDModel`, optional
+    :return: Integrated activity variables of the model, the first `startind` columns of the
+        activity arrays contain the last state, followed by the recorded time steps
     :rtype: (numpy.ndarray,)
     """
+    # the nodes are integrated in parallel on `n_threads` threads
+    n_threads = params.get("n_threads", 1)
+    return batch.integrate(
+        timeIntegration_njit_elementwise, timeIntegration_args(params, sample_every, boldModel), n_threads
+    )
+
+
+def timeIntegration_args(params, sample_every=1, boldModel=None):
+    """Sets up the parameters for time integration and returns the arguments of
+    `timeIntegration_njit_elementwise`
+
+    :param params: Parameter dictionary of the model
+    :type params: dict
+    :param sample_every: only record every `sample_every`-th time step in the outputs, defaults to 1
+    :type sample_every: int, optional
+    :param boldModel: integrate the BOLD model along with the model, only its samples are recorded,
+        defaults to None
+    :type boldModel: `neurolib.models.bold.BOLDModel`, optional
+    :return: Arguments of the integration kernel
+    :rtype: tuple
+    """
 
     dt = params["dt"]  # Time step for the Euler intergration (ms)
     duration = params["duration"]  # imulation duration (ms)
@@ -62,6 +91,9 @@ def timeIntegration(params):
         Dmat[np.eye(len(Dmat)) == 1] = np.zeros(len(Dmat))
     Dmat_ndt = np.around(Dmat / dt).astype(int)  # delay matrix in multiples of dt
     params["Dmat_ndt"] = Dmat_ndt
+
+    # if Cmat is sparse, only the nonzero afferent connections of every node are integrated
+    sparse_coupling, Cmat_indptr, Cmat_indices = sparse.afferents(Cmat)
     # ------------------------------------------------------------------------
 
     # Initialization
@@ -79,10 +111,18 @@ def timeIntegration(params):
     x_ext = params["x_ext"]
     y_ext = params["y_ext"]
 
-    # state variable arrays, have length of t + startind
-    # they store initial conditions AND simulated data
-    xs = np.zeros((N, startind + len(t)))
-    ys = np.zeros((N, startind + len(t)))
+    # number of recorded time steps
+    n_samples = (len(t) + sample_every - 1) // sample_every
+
+    # output arrays, the first startind columns will hold the last state
+    xs = np.zeros((N, startind + n_samples))
+    ys = np.zeros((N, startind + n_samples))
+
+    # the history of the last startind + 1 time steps (needed for the delays) is kept in ring
+    # buffers, time step i is stored at index i % history_length
+    history_length = startind + 1
+    xs_hist = np.zeros((N, history_length))
+    ys_hist = np.zeros((N, history_length))
 
     # ------------------------------------------------------------------------
     # Set initial values
@@ -99,21 +139,27 @@ def timeIntegration(params):
     xs_input_d = np.zeros(N)  # delayed input to x
     ys_input_d = np.zeros(N)  # delayed input to y
 
-    np.random.seed(RNGseed)
+    # the noise is drawn during the integration from counter-based random streams (one per node)
+    # that are indexed by the absolute time step, `noise_step` time steps were integrated before
+    noise_keys = rng.streamKeys(RNGseed, N)
+    noise_step = params.get("noise_step", 0)
 
-    # Save the noise in the activity array to save memory
-    xs[:, startind:] = np.random.standard_normal((N, len(t)))
-    ys[:, startind:] = np.random.standard_normal((N, len(t)))
+    # the integration is aborted if the state is not finite or exploded, checked every `check_every` time steps
+    check_every = params["divergence_check_every"]
+    divergence_threshold = params["divergence_threshold"]
 
-    xs[:, :startind] = xs_init
-    ys[:, :startind] = ys_init
+    xs_hist[:, :startind] = xs_init
+    ys_hist[:, :startind] = ys_init
 
     noise_xs = np.zeros((N,))
     noise_ys = np.zeros((N,))
 
     # ------------------------------------------------------------------------
 
-    return timeIntegration_njit_elementwise(
+    # the BOLD model is integrated along with the model and only its samples are recorded
+    bold_every, bold_phase, bold_dt, bold_state, BOLD = bold.fusedArgs(boldModel, N, len(t))
+
+    return (
         startind,
         t,
         dt,
@@ -126,8 +172,23 @@ def timeIntegration(params):
         signalV,
         coupling,
         Dmat_ndt,
+        sparse_coupling,
+        Cmat_indptr,
+        Cmat_indices,
         xs,
         ys,
+        xs_hist,
+        ys_hist,
+        noise_keys,
+        noise_step,
+        sample_every,
+        check_every,
+        divergence_threshold,
+        bold_every,
+        bold_phase,
+        bold_dt,
+        bold_state,
+        BOLD,
         xs_input_d,
         ys_input_d,
         x_ext,
@@ -145,7 +206,7 @@ def timeIntegration(params):
     )
 
 
-@numba.njit
+@numba.njit(nogil=True, cache=True)
 def timeIntegration_njit_elementwise(
     startind,
     t,
@@ -159,8 +220,23 @@ def timeIntegration_njit_elementwise(
     signalV,
     coupling,
     Dmat_ndt,
+    sparse_coupling,
+    Cmat_indptr,
+    Cmat_indices,
     xs,
     ys,
+    xs_hist,
+    ys_hist,
+    noise_keys,
+    noise_step,
+    sample_every,
+    check_every,
+    divergence_threshold,
+    bold_every,
+    bold_phase,
+    bold_dt,
+    bold_state,
+    BOLD,
     xs_input_d,
     ys_input_d,
     x_ext,
@@ -176,15 +252,28 @@ def timeIntegration_njit_elementwise(
     tau_ou,
     sigma_ou,
 ):
+    # length of the ring buffers
+    n_hist = xs_hist.shape[1]
+    # index of the next recorded time step in the outputs
+    s = startind
+    # index of the next BOLD sample
+    s_bold = 0
+
     ### integrate ODE system:
+    # index after the last integrated time step
+    i_end = startind + len(t)
+
     for i in range(startind, startind + len(t)):
 
+        # index of the current time step in the ring buffers, the delayed time steps j - d - 1 < 0
+        # wrap around to the end of the ring buffers
+        j = i % n_hist
+
         # loop through all the nodes
-        for no in range(N):
+        for no in numba.prange(N):
 
-            # To save memory, noise is saved in the activity array
-            noise_xs[no] = xs[no, i]
-            noise_ys[no] = ys[no, i]
+            # noise of the current time step
+            noise_xs[no], noise_ys[no] = rng.normals(noise_keys[no], noise_step + i - startind)
 
             # delayed input to each node
             xs_input_d[no] = 0
@@ -192,37 +281,84 @@ def timeIntegration_njit_elementwise(
 
             # diffusive coupling
             if coupling == 0:
-                for l in range(N):
-                    xs_input_d[no] += K_gl * Cmat[no, l] * (xs[l, i - Dmat_ndt[no, l] - 1] - xs[no, i - 1])
-                    # ys_input_d[no] += K_gl * Cmat[no, l] * (ys[l, i - Dmat_ndt[no, l] - 1] - ys[no, i - 1])
+                if sparse_coupling:
+                    for k in range(Cmat_indptr[no], Cmat_indptr[no + 1]):
+                        l = Cmat_indices[k]
+                        xs_input_d[no] += (
+                            K_gl * Cmat[no, l] * (xs_hist[l, j - Dmat_ndt[no, l] - 1] - xs_hist[no, j - 1])
+                        )
+                else:
+                    for l in range(N):
+                        xs_input_d[no] += (
+                            K_gl * Cmat[no, l] * (xs_hist[l, j - Dmat_ndt[no, l] - 1] - xs_hist[no, j - 1])
+                        )
+                        # ys_input_d[no] += K_gl * Cmat[no, l] * (ys_hist[l, j - Dmat_ndt[no, l] - 1] - ys_hist[no, j - 1])
             # additive coupling
             elif coupling == 1:
-                for l in range(N):
-                    xs_input_d[no] += K_gl * Cmat[no, l] * (xs[l, i - Dmat_ndt[no, l] - 1])
-                    # ys_input_d[no] += K_gl * Cmat[no, l] * (ys[l, i - Dmat_ndt[no, l] - 1])
+                if sparse_coupling:
+                    for k in range(Cmat_indptr[no], Cmat_indptr[no + 1]):
+                        l = Cmat_indices[k]
+                        xs_input_d[no] += K_gl * Cmat[no, l] * (xs_hist[l, j - Dmat_ndt[no, l] - 1])
+                else:
+                    for l in range(N):
+                        xs_input_d[no] += K_gl * Cmat[no, l] * (xs_hist[l, j - Dmat_ndt[no, l] - 1])
+                        # ys_input_d[no] += K_gl * Cmat[no, l] * (ys_hist[l, j - Dmat_ndt[no, l] - 1])
 
             # Stuart-Landau / Hopf Oscillator
             x_rhs = (
-                (a - xs[no, i - 1] ** 2 - ys[no, i - 1] ** 2) * xs[no, i - 1]
-                - w * ys[no, i - 1]
+                (a - xs_hist[no, j - 1] ** 2 - ys_hist[no, j - 1] ** 2) * xs_hist[no, j - 1]
+                - w * ys_hist[no, j - 1]
                 + xs_input_d[no]  # input from other nodes
                 + x_ou[no]  # ou noise
                 + x_ext[no]  # external input
             )
             y_rhs = (
-                (a - xs[no, i - 1] ** 2 - ys[no, i - 1] ** 2) * ys[no, i - 1]
-                + w * xs[no, i - 1]
+                (a - xs_hist[no, j - 1] ** 2 - ys_hist[no, j - 1] ** 2) * ys_hist[no, j - 1]
+                + w * xs_hist[no, j - 1]
                 + ys_input_d[no]  # input from other nodes
                 + y_ou[no]  # ou noise
                 + y_ext[no]  # external input
             )
 
             # Euler integration
-            xs[no, i] = xs[no, i - 1] + dt * x_rhs
-            ys[no, i] = ys[no, i - 1] + dt * y_rhs
+            xs_hist[no, j] = xs_hist[no, j - 1] + dt * x_rhs
+            ys_hist[no, j] = ys_hist[no, j - 1] + dt * y_rhs
 
             # Ornstein-Uhlenbeck process
             x_ou[no] = x_ou[no] + (x_ou_mean - x_ou[no]) * dt / tau_ou + sigma_ou * sqrt_dt * noise_xs[no]  # mV/ms
             y_ou[no] = y_ou[no] + (y_ou_mean - y_ou[no]) * dt / tau_ou + sigma_ou * sqrt_dt * noise_ys[no]  # mV/ms
 
-    return t, xs, ys, x_ou, y_ou
+            # the BOLD model of the node is driven by its default output
+            if bold_every > 0:
+                bold.balloonWindkesselStep(bold_state, no, xs_hist[no, j], bold_dt)
+
+        # only record every sample_every-th time step
+        if (i - startind) % sample_every == 0:
+            xs[:, s] = xs_hist[:, j]
+            ys[:, s] = ys_hist[:, j]
+            s += 1
+
+        # record the BOLD signal every bold_every-th time step
+        if bold_every > 0 and (bold_phase + i - startind) % bold_every == 0:
+            for no in range(N):
+                BOLD[no, s_bold] = bold.boldSignal(bold_state, no)
+            s_bold += 1
+
+        # abort the integration if the state diverged, the remaining outputs are nan
+        if check_every > 0 and (i - startind) % check_every == 0:
+            if not (
+                np.all(np.abs(xs_hist[:, j]) <= divergence_threshold)
+                and np.all(np.abs(ys_hist[:, j]) <= divergence_threshold)
+            ):
+                xs[:, s:] = np.nan
+                ys[:, s:] = np.nan
+                BOLD[:, s_bold:] = np.nan
+                i_end = i + 1
+                break
+
+    # the last startind time steps are the initial state of the next run
+    for k in range(startind):
+        xs[:, k] = xs_hist[:, (i_end - startind + k) % n_hist]
+        ys[:, k] = ys_hist[:, (i_end - startind + k) % n_hist]
+
+    return t, xs, ys, x_ou, y_ou, BOLD, bold_state
@@ -1,10 +1,10 @@
 import logging
-import xarray as xr
 import numpy as np
 
 from ..models import bold
 
-from ..utils.collections import dotdict
+from ..utils.collections import dotdict, GrowableArray
+from ..utils import batch
 
 
 class Model:
@@ -12,6 +12,20 @@ class Model:
     This class should serve as the base class for all implemented models.
     """
 
+    # if True, `integration(params, sample_every)` only records every `sample_every`-th
+    # time step and returns the last state in the first `startindt` columns of each output
+    integrationSubsampling = False
+    # setup of the arguments (`integrationArgs(params, sample_every)`) and the compiled kernel of the
+    # integration, needed for batched runs
+    integrationArgs = None
+    integrationKernel = None
+    # if True, the integration draws the noise from counter-based random streams and `params["noise_step"]`
+    # holds the number of time steps that were integrated since the start of the simulation
+    counterNoise = False
+    # if True, `integration(params, sample_every, boldModel)` integrates the BOLD model along with the model if a
+    # BOLD model is given, the BOLD samples and the state of the BOLD model are returned after the state variables
+    integrationBold = False
+
     def __init__(self, integration, params):
         if hasattr(self, "name"):
             if self.name is not None:
@@ -44,6 +58,16 @@ class Model:
         # create output and state dictionary
         self.outputs = dotdict({})
         self.state = dotdict({})
+        # growable buffers behind appended outputs
+        self.outputBuffers = {}
+        self.outputCapacity = None
+        # sink to stream outputs to during a run
+        self.sink = None
+        # reducers that fold the outputs of the current run
+        self.reducers = []
+        self.reductions = dotdict({})
+        # "ok" or "diverged" after a run, the native integration is aborted when the state diverges
+        self.run_status = None
         self.maxDelay = None
         self.initializeRun()
 
@@ -92,13 +116,9 @@ class Model:
                         if self.boldInputTransform:
                             bold_input = self.boldInputTransform(bold_input)
 
-                        # simulate bold model
-                        self.boldModel.run(bold_input, append=append)
-
-                        t_BOLD = self.boldModel.t_BOLD
-                        BOLD = self.boldModel.BOLD
-                        self.setOutput("BOLD.t_BOLD", t_BOLD)
-                        self.setOutput("BOLD.BOLD", BOLD)
+                        # simulate bold model, if a sink is used, only the current chunk is kept
+                        self.boldModel.run(bold_input, append=append and self.sink is None)
+                        self.storeBoldOutputs()
                     else:
                         logging.warn(
                             f"Will not simulate BOLD if output {bold_input.shape[1]*self.params['dt']} not at least of duration {self.boldModel.samplingRate_NDt*self.params['dt']}"
@@ -106,6 +126,12 @@ class Model:
         else:
             logging.warn("BOLD model not initialized, not simulating BOLD. Use `run(bold=True)`")
 
+    def storeBoldOutputs(self):
+        """Adds the BOLD signal of the BOLD model to the outputs."""
+        self.setOutput("BOLD.t_BOLD", self.boldModel.t_BOLD)
+        self.setOutput("BOLD.BOLD", self.boldModel.BOLD)
+        self.reduceOutput("BOLD.BOLD", self.boldModel.BOLD_chunk)
+
     def checkChunkwise(self, chunksize):
         """Checks if the model fulfills requirements for chunkwise simulation.
         Checks whether the sampling rate for outputs fits to chunksize and duration.
@@ -188,6 +214,8 @@ class Model:
         append=False,
         append_outputs=None,
         continue_run=False,
+        sink=None,
+        reducers=None,
     ):
         """
         Main interfacing function to run a model.
@@ -209,6 +237,14 @@ class Model:
         :type append: bool, optional
         :param continue_run: continue a simulation by using the initial values from a previous simulation
         :type continue_run: bool
+        :param sink: stream all outputs to a sink (for example `neurolib.utils.sinks.HDF5Sink`) while they are
+            simulated, the outputs of all chunks are appended to the sink and `model.outputs` only holds the last chunk,
+            defaults to None
+        :type sink: `neurolib.utils.sinks.Sink`, optional
+        :param reducers: fold the outputs into summary statistics while they are simulated (for example
+            `neurolib.utils.reducers.RunningFC`), the results are stored in `model.reductions`. If a previous run is
+            continued, the reducers keep accumulating, defaults to None
+        :type reducers: list[`neurolib.utils.reducers.Reducer`], optional
         """
         # TODO: legacy argument support
         if append_outputs is not None:
@@ -223,39 +259,131 @@ class Model:
         # enable chunkwise if chunksize is set
         chunkwise = chunkwise if chunksize is None else True
 
-        if chunkwise is False:
-            self.integrate(append_outputs=append, simulate_bold=bold)
-            if continue_run:
-                self.setInitialValuesToLastState()
+        # chunks are appended to the sink instead of the outputs in memory
+        if sink is not None:
+            append = True
+            sink.open(self)
+        self.sink = sink
 
-        else:
-            if chunksize is None:
-                chunksize = int(2000 / self.params["dt"])
+        self.reducers = reducers or []
+        for reducer in self.reducers:
+            if not continue_run or not reducer.initialized:
+                reducer.reset(self)
 
-            # check if model is safe for chunkwise integration
-            # and whether sampling_dt is compatible with duration and chunksize
-            self.checkChunkwise(chunksize)
-            if bold and not self.boldInitialized:
-                logging.warn(f"{self.name}: BOLD model not initialized, not simulating BOLD. Use `run(bold=True)`")
-                bold = False
-            self.integrateChunkwise(chunksize=chunksize, bold=bold, append_outputs=append)
+        try:
+            if chunkwise is False:
+                self.integrate(append_outputs=append, simulate_bold=bold)
+                if continue_run:
+                    self.setInitialValuesToLastState()
+
+            else:
+                if chunksize is None:
+                    chunksize = int(2000 / self.params["dt"])
+
+                # check if model is safe for chunkwise integration
+                # and whether sampling_dt is compatible with duration and chunksize
+                self.checkChunkwise(chunksize)
+                if bold and not self.boldInitialized:
+                    logging.warn(f"{self.name}: BOLD model not initialized, not simulating BOLD. Use `run(bold=True)`")
+                    bold = False
+                self.integrateChunkwise(chunksize=chunksize, bold=bold, append_outputs=append)
+        finally:
+            if sink is not None:
+                sink.close()
+            self.sink = None
+            reducers, self.reducers = self.reducers, []
+
+        if reducers:
+            self.reductions = dotdict({reducer.name: reducer.result() for reducer in reducers})
 
         # check if there was a problem with the simulated data
         self.checkOutputs()
 
+    def run_batch(self, param_list, parallel=True):
+        """Simulates a batch of parameter sets in a single call of a compiled kernel. This avoids the
+        setup of a full `run()` for every parameter set and is much faster for small networks and short
+        simulations. The outputs and the state of the model are not changed.
+
+        Every parameter set updates a copy of `model.params`, all parameter sets must lead to arrays of
+        the same shape (i.e. same number of nodes and maximum delay). The duration and the sampling of
+        the simulation are taken from `model.params`.
+
+        :param param_list: parameter sets to simulate
+        :type param_list: list[dict]
+        :param parallel: simulate the parameter sets in parallel, defaults to True
+        :type parallel: bool, optional
+        :return: outputs of the model with the parameter sets along the first axis
+        :rtype: dict
+        """
+        argsList = self._batchArgs(param_list)
+        t, *variables = batch.integrateBatch(self.integrationKernel, argsList, parallel=parallel)
+        return self._batchOutputs(t, variables)
+
+    def run_ensemble(self, seeds, n_threads=None):
+        """Simulates an ensemble of noise realizations of the model that only differ in `params["seed"]`.
+        The compiled kernels release the GIL, so the realizations are integrated on a pool of threads that
+        share all read-only parameters (e.g. `Cmat`, `Dmat` and lookup tables). The outputs and the state of
+        the model are not changed.
+
+        :param seeds: seeds of the realizations
+        :type seeds: list[int]
+        :param n_threads: number of threads, defaults to the number of CPUs
+        :type n_threads: int, optional
+        :return: outputs of the model with the realizations along the first axis
+        :rtype: dict
+        """
+        argsList = self._batchArgs([{"seed": seed} for seed in seeds])
+        t, *variables = batch.integrateThreaded(self.integrationKernel, argsList, n_threads=n_threads)
+        return self._batchOutputs(t, variables)
+
+    def _batchArgs(self, param_list):
+        """Sets up the arguments of the integration kernel for a batch of parameter sets."""
+        assert self.integrationKernel is not None, f"Model {self.name} does not support batched runs."
+        for p in param_list:
+            for key in ["duration", "dt", "sampling_dt"]:
+                assert key not in p, f"`{key}` can't be changed in a batch, set it in `model.params`."
+        self.setSamplingDt()
+
+        argsList = []
+        for p in param_list:
+            params = dotdict(self.params)
+            params.update(p)
+            # the integration changes the initial values in place
+            for iv in self.init_vars:
+                if isinstance(params.get(iv), np.ndarray):
+                    params[iv] = params[iv].copy()
+            argsList.append(self.integrationArgs(params, sample_every=self.sample_every))
+        return argsList
+
+    def _batchOutputs(self, t, variables):
+        """Collects the outputs of a batch from the batched return values of the integration kernel."""
+        t = t[0] if t.ndim == 2 else t
+        t = t[:: self.sample_every]
+        outputs = dotdict({"t": t})
+        for svn, sv in zip(self.state_vars, variables):
+            if svn in self.output_vars:
+                # remove the last state in front of the outputs
+                outputs[svn] = sv[..., sv.shape[-1] - len(t) :]
+        return outputs
+
     def checkOutputs(self):
+        """Checks the outputs for nans and exploded values and sets `run_status` to "diverged" or "ok"."""
+        self.run_status = "ok"
         # check nans in output
         if np.isnan(self.output).any():
             logging.error("nan in model output!")
+            self.run_status = "diverged"
         else:
-            EXPLOSION_THRESHOLD = 1e20
-            if (self.output > EXPLOSION_THRESHOLD).any() > 0:
-                logging.error("nan in model output!")
+            EXPLOSION_THRESHOLD = self.params.get("divergence_threshold", 1e20)
+            if (np.abs(self.output) > EXPLOSION_THRESHOLD).any():
+                logging.error("explosion in model output!")
+                self.run_status = "diverged"
 
         # check nans in BOLD
         if "BOLD" in self.outputs:
             if np.isnan(self.outputs.BOLD.BOLD).any():
                 logging.error("nan in BOLD output!")
+                self.run_status = "diverged"
 
     def integrate(self, append_outputs=False, simulate_bold=False):
         """Calls each models `integration` function and saves the state and the outputs of the model.
@@ -263,16 +391,37 @@ class Model:
         :param append: append the chunkwise outputs to the outputs attribute, defaults to False, defaults to False
         :type append: bool, optional
         """
-        # run integration
-        t, *variables = self.integration(self.params)
-        self.storeOutputsAndStates(t, variables, append=append_outputs)
-
         # force bold if params['bold'] == True
         if self.params.get("bold"):
             simulate_bold = True
+        simulate_bold = simulate_bold and self.boldInitialized
+        # with `params["fused_bold"]`, the BOLD model is integrated along with the model and only its samples are
+        # recorded, this is not possible if the input of the BOLD model is transformed
+        fuse_bold = (
+            simulate_bold and self.integrationBold and self.params.get("fused_bold") and self.boldInputTransform is None
+        )
+
+        # run integration
+        kwargs = {}
+        if self.integrationSubsampling:
+            # the BOLD model needs the full resolution of the default output, unless it is fused
+            kwargs["sample_every"] = 1 if simulate_bold and not fuse_bold else self.sample_every
+        if self.integrationBold:
+            kwargs["boldModel"] = self.boldModel if fuse_bold else None
+        t, *variables = self.integration(self.params, **kwargs)
+        if self.integrationBold:
+            *variables, BOLD, boldState = variables
+        self.storeOutputsAndStates(t, variables, append=append_outputs, subsampled=kwargs.get("sample_every", 1) > 1)
+
+        if self.counterNoise:
+            # the next chunk or continued run draws the noise of the following time steps
+            self.params["noise_step"] = self.params.get("noise_step", 0) + len(t)
 
         # bold simulation after integration
-        if simulate_bold and self.boldInitialized:
+        if fuse_bold:
+            self.boldModel.storeFused(BOLD, boldState, len(t), append=self.sink is None)
+            self.storeBoldOutputs()
+        elif simulate_bold:
             self.simulateBold(t, variables, append=True)
 
     def integrateChunkwise(self, chunksize, bold=False, append_outputs=False):
@@ -289,6 +438,12 @@ class Model:
         totalDuration = self.params["duration"]
 
         dt = self.params["dt"]
+
+        # preallocate appended outputs for the whole simulation
+        if append_outputs:
+            previousSamples = self.outputs["t"].shape[-1] if "t" in self.outputs else 0
+            self.outputCapacity = previousSamples + int(round(totalDuration / dt)) // self.sample_every + 1
+
         # create a shallow copy of the parameters
         lastT = 0
         while totalDuration - lastT >= dt - 1e-6:
@@ -305,16 +460,21 @@ class Model:
 
         # set duration back to its original value
         self.params["duration"] = totalDuration
+        self.outputCapacity = None
 
     def clearModelState(self):
         """Clears the model's state to create a fresh one"""
         self.state = dotdict({})
         self.outputs = dotdict({})
+        self.outputBuffers = {}
+        self.reductions = dotdict({})
+        if self.counterNoise:
+            self.params["noise_step"] = 0
         # reinitialize bold model
         if self.params.get("bold"):
             self.initializeBold()
 
-    def storeOutputsAndStates(self, t, variables, append=False):
+    def storeOutputsAndStates(self, t, variables, append=False, subsampled=False):
         """Takes the simulated variables of the integration and stores it to the appropriate model output and state object.
 
         :param t: time vector
@@ -323,6 +483,8 @@ class Model:
         :type variables: numpy.ndarray
         :param append: append output to existing output or overwrite, defaults to False
         :type append: bool, optional
+        :param subsampled: variables were already subsampled during the integration, defaults to False
+        :type subsampled: bool, optional
         """
         # save time array
         self.setOutput("t", t, append=append, removeICs=True)
@@ -330,7 +492,10 @@ class Model:
         # save outputs
         for svn, sv in zip(self.state_vars, variables):
             if svn in self.output_vars:
-                self.setOutput(svn, sv, append=append, removeICs=True)
+                self.setOutput(svn, sv, append=append, removeICs=True, subsample=not subsampled)
+            if self.integrationSubsampling and sv.ndim == 2:
+                # the last state is stored in front of the outputs
+                sv = sv[:, : self.startindt]
             self.setStateVariables(svn, sv)
 
     def setInitialValuesToLastState(self):
@@ -453,12 +618,26 @@ class Model:
         else:
             self.state[name] = data.copy()
 
-    def setOutput(self, name, data, append=False, removeICs=False):
+    def reduceOutput(self, name, data):
+        """Folds a new chunk of an output into all reducers of the current run that are attached to it.
+
+        :param name: name of the output
+        :type name: str
+        :param data: output chunk
+        :type data: numpy.ndarray
+        """
+        for reducer in self.reducers:
+            if reducer.outputName == name:
+                reducer.update(data)
+
+    def setOutput(self, name, data, append=False, removeICs=False, subsample=True):
         """Adds an output to the model, typically a simulation result.
         :params name: Name of the output in dot.notation, a la "outputgroup.output"
         :type name: str
         :params data: Output data, can't be a dictionary!
         :type data: `numpy.ndarray`
+        :params subsample: subsample the data to `sampling_dt`, defaults to True
+        :type subsample: bool, optional
         """
         assert not isinstance(data, dict), "Output data cannot be a dictionary."
         assert isinstance(name, str), "Output name must be a string."
@@ -474,12 +653,13 @@ class Model:
                 raise ValueError(f"Don't know how to truncate data of shape {data.shape}.")
 
         # subsample to sampling dt
-        if data.ndim == 1:
-            data = data[:: self.sample_every]
-        elif data.ndim == 2:
-            data = data[:, :: self.sample_every]
-        else:
-            raise ValueError(f"Don't know how to subsample data of shape {data.shape}.")
+        if subsample:
+            if data.ndim == 1:
+                data = data[:: self.sample_every]
+            elif data.ndim == 2:
+                data = data[:, :: self.sample_every]
+            else:
+                raise ValueError(f"Don't know how to subsample data of shape {data.shape}.")
 
         # if the output is a single name (not dot.separated)
         if "." not in name:
@@ -489,12 +669,26 @@ class Model:
                 # increment the time by the last recorded duration
                 if name == "t":
                     data += self.outputs[name][-1]
-                self.outputs[name] = np.hstack((self.outputs[name], data))
+                if self.sink is not None:
+                    # data is appended to the sink, only keep the current chunk
+                    self.outputs[name] = data
+                else:
+                    # the buffer is created with the first append, unless the output was
+                    # replaced in the meantime, we keep appending to the existing buffer
+                    buffer = self.outputBuffers.get(name)
+                    if buffer is None or buffer.data is not self.outputs[name]:
+                        buffer = GrowableArray(self.outputs[name], capacity=self.outputCapacity)
+                        self.outputBuffers[name] = buffer
+                    self.outputs[name] = buffer.append(data)
             else:
                 # save all data into output dict
+                self.outputBuffers.pop(name, None)
                 self.outputs[name] = data
             # set output as an attribute
             setattr(self, name, self.outputs[name])
+            if self.sink is not None:
+                self.sink.write(name, data)
+            self.reduceOutput(name, data)
         else:
             # build results dictionary and write into self.outputs
             # dot.notation iteration
@@ -511,6 +705,8 @@ class Model:
                     # else:
                     #     level[k] = data
                     level[k] = data
+                    if self.sink is not None:
+                        self.sink.write(name, data)
                 # if key is in outputs, then go deeper
                 elif k in level:
                     level = level[k]
@@ -588,6 +784,8 @@ class Model:
         :param group: Output group name, example:  "BOLD". Leave empty for top group.
         :type group: str
         """
+        import xarray as xr
+
         assert isinstance(group, str), "Group name must be a string."
         # take all outputs of one group: disregard all dictionaries because they are subgroups
         outputDict = self.getOutputs(group)
@@ -1,7 +1,33 @@
-from .builder.aln import ALNNetwork, ALNNode
-from .builder.fitzhugh_nagumo import FitzHughNagumoNetwork, FitzHughNagumoNode
-from .builder.hopf import HopfNetwork, HopfNode
-from .builder.thalamus import ThalamicNode
-from .builder.wilson_cowan import WilsonCowanNetwork, WilsonCowanNode
-from .builder.wong_wang import ReducedWongWangNetwork, ReducedWongWangNode, WongWangNetwork, WongWangNode
-from .model import MultiModel
+import importlib
+
+# the builders depend on sympy, symengine and jitcdde, so they are only imported when they are first accessed
+_lazyImports = {
+    "ALNNetwork": ".builder.aln",
+    "ALNNode": ".builder.aln",
+    "FitzHughNagumoNetwork": ".builder.fitzhugh_nagumo",
+    "FitzHughNagumoNode": ".builder.fitzhugh_nagumo",
+    "HopfNetwork": ".builder.hopf",
+    "HopfNode": ".builder.hopf",
+    "ThalamicNode": ".builder.thalamus",
+    "WilsonCowanNetwork": ".builder.wilson_cowan",
+    "WilsonCowanNode": ".builder.wilson_cowan",
+    "ReducedWongWangNetwork": ".builder.wong_wang",
+    "ReducedWongWangNode": ".builder.wong_wang",
+    "WongWangNetwork": ".builder.wong_wang",
+    "WongWangNode": ".builder.wong_wang",
+    "MultiModel": ".model",
+}
+
+__all__ = list(_lazyImports)
+
+
+def __getattr__(name):
+    if name in _lazyImports:
+        value = getattr(importlib.import_module(_lazyImports[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -57,6 +57,19 @@ def timer(method):
     return decorator
 
 
+@numba.njit(cache=True)
+def diverged(y, threshold):
+    """
+    Checks whether a state is not finite or larger than `threshold`. Compiled
+    without `fastmath`, so the check for nans is kept in the integration
+    function.
+    """
+    for k in range(y.shape[0]):
+        if not abs(y[k]) <= threshold:
+            return True
+    return False
+
+
 class BaseBackend:
     """
     Base class for backends.
@@ -103,13 +116,16 @@ class NumbaBackend(BaseBackend):
     compiled_function = None
 
     NUMBA_EULER_TEMPLATE = """
-def integrate(dt, system_size, max_delay, t_max, y0, input_y, {params}):
+def integrate(dt, system_size, max_delay, t_max, y0, input_y, check_every, divergence_threshold, {params}):
     y = np.empty((system_size, t_max + max_delay + 1))
     y[:] = np.nan
     y[:, :max_delay + 1] = y0
     for i in range(1, t_max + 1):
         dy = np.array({dy_eqs})
         y[:, max_delay + i] = y[:, max_delay + i - 1] + dt*dy
+        # abort the integration if the state diverged, the remaining time steps stay nan
+        if check_every > 0 and i % check_every == 0 and diverged(y[:, max_delay + i], divergence_threshold):
+            break
 
     return y[:, max_delay + 1:]
 """
@@ -299,10 +315,26 @@ def integrate(dt, system_size, max_delay, t_max, y0, input_y, {params}):
         )
         self.compiled_function = integrate
 
-    def run(self, duration, dt, noise_input, symbol_params, float_params, **kwargs):
+    def run(
+        self,
+        duration,
+        dt,
+        noise_input,
+        symbol_params,
+        float_params,
+        divergence_check_every=1000,
+        divergence_threshold=1e20,
+        **kwargs,
+    ):
         """
         Run integration.
 
+        :param divergence_check_every: the integration is aborted if the state
+            is not finite or larger than `divergence_threshold`, checked every
+            `divergence_check_every` time steps (0: never)
+        :type divergence_check_every: int
+        :param divergence_threshold: threshold for the divergence check
+        :type divergence_threshold: float
         :kwargs: actually none - for compatiblity
         """
         assert isinstance(noise_input, np.ndarray)
@@ -333,6 +365,8 @@ def integrate(dt, system_size, max_delay, t_max, y0, input_y, {params}):
             t_max=np.around(duration / dt).astype(int),
             y0=init_state,
             input_y=noise_input,
+            check_every=divergence_check_every,
+            divergence_threshold=divergence_threshold,
             **model_params,
         )
         return times, result
@@ -9,7 +9,15 @@ from .builder.base.constants import NETWORK_CONNECTIVITY, NETWORK_DELAYS
 from .builder.base.network import Network, Node
 
 # default run parameters for MultiModels
-DEFAULT_RUN_PARAMS = {"duration": 2000, "dt": 0.1, "seed": None, "backend": "jitcdde"}
+DEFAULT_RUN_PARAMS = {
+    "duration": 2000,
+    "dt": 0.1,
+    "seed": None,
+    "backend": "jitcdde",
+    # the numba backend aborts the integration if the state diverges
+    "divergence_check_every": 1000,
+    "divergence_threshold": 1e20,
+}
 
 
 class MultiModel(Model):
@@ -53,6 +61,12 @@ class MultiModel(Model):
         # create output and state dictionary
         self.outputs = dotdict({})
         self.state = dotdict({})
+        self.outputBuffers = {}
+        self.outputCapacity = None
+        self.sink = None
+        self.reducers = []
+        self.reductions = dotdict({})
+        self.run_status = None
         self.maxDelay = None
         self.initializeRun()
 
@@ -132,6 +146,8 @@ class MultiModel(Model):
         append_outputs=None,
         continue_run=False,
         noise_input=None,
+        sink=None,
+        reducers=None,
     ):
         self._update_model_params()
 
@@ -145,20 +161,40 @@ class MultiModel(Model):
 
         self.initializeRun(initializeBold=bold)
 
-        if chunkwise is False:
-            self.integrate(append_outputs=append, simulate_bold=bold, noise_input=noise_input)
-            if continue_run:
-                self.setInitialValuesToLastState()
+        # chunks are appended to the sink instead of the outputs in memory
+        if sink is not None:
+            append = True
+            sink.open(self)
+        self.sink = sink
 
-        else:
-            if chunksize is None:
-                chunksize = int(2000 / self.params["dt"])
-            # check if model is safe for chunkwise integration
-            self.checkChunkwise(chunksize)
-            if bold and not self.boldInitialized:
-                logging.warn(f"{self.name}: BOLD model not initialized, not simulating BOLD. Use `run(bold=True)`")
-                bold = False
-            self.integrateChunkwise(chunksize=chunksize, bold=bold, append_outputs=append)
+        self.reducers = reducers or []
+        for reducer in self.reducers:
+            if not continue_run or not reducer.initialized:
+                reducer.reset(self)
+
+        try:
+            if chunkwise is False:
+                self.integrate(append_outputs=append, simulate_bold=bold, noise_input=noise_input)
+                if continue_run:
+                    self.setInitialValuesToLastState()
+
+            else:
+                if chunksize is None:
+                    chunksize = int(2000 / self.params["dt"])
+                # check if model is safe for chunkwise integration
+                self.checkChunkwise(chunksize)
+                if bold and not self.boldInitialized:
+                    logging.warn(f"{self.name}: BOLD model not initialized, not simulating BOLD. Use `run(bold=True)`")
+                    bold = False
+                self.integrateChunkwise(chunksize=chunksize, bold=bold, append_outputs=append)
+        finally:
+            if sink is not None:
+                sink.close()
+            self.sink = None
+            reducers, self.reducers = self.reducers, []
+
+        if reducers:
+            self.reductions = dotdict({reducer.name: reducer.result() for reducer in reducers})
 
         # check if there was a problem with the simulated data
         self.checkOutputs()
@@ -203,6 +239,8 @@ class MultiModel(Model):
             noise_input=noise_input,
             backend=self.params["backend"],
             return_xarray=True,
+            divergence_check_every=self.params.get("divergence_check_every", 1000),
+            divergence_threshold=self.params.get("divergence_threshold", 1e20),
         )
         self.storeOutputsAndStates(result, append=append_outputs)
         # force bold if params['bold'] == True
@@ -263,13 +301,14 @@ class MultiModel(Model):
                 if self.boldInputTransform:
                     bold_input = self.boldInputTransform(bold_input)
 
-                # simulate bold model
-                self.boldModel.run(bold_input, append=append)
+                # simulate bold model, if a sink is used, only the current chunk is kept
+                self.boldModel.run(bold_input, append=append and self.sink is None)
 
                 t_BOLD = self.boldModel.t_BOLD
                 BOLD = self.boldModel.BOLD
                 self.setOutput("BOLD.t_BOLD", t_BOLD)
                 self.setOutput("BOLD.BOLD", BOLD)
+                self.reduceOutput("BOLD.BOLD", self.boldModel.BOLD_chunk)
             else:
                 logging.warn(
                     f"Will not simulate BOLD if output {bold_input.shape[1]*self.params['dt']} not at least of duration"
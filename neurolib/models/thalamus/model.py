@@ -60,6 +60,8 @@ class ThalamicMassModel(Model):
     default_output = "Q_t"
     input_vars = []
     default_input = None
+    # the integration only records every `sample_every`-th time step
+    integrationSubsampling = True
 
     def __init__(self, params=None, seed=None):
         self.seed = seed
@@ -2,16 +2,45 @@ import numpy as np
 import numba
 
 from . import loadDefaultParams as dp
+from ..bold import timeIntegration as bold
+from ...utils import batch, rng, sparse
 
 
-def timeIntegration(params):
-    """Sets up the parameters for time integration
+def timeIntegration(params, sample_every=1, boldModel=None):
+    """Sets up the parameters for time integration and integrates the model
 
     :param params: Parameter dictionary of the model
     :type params: dict
-    :return: Integrated activity variables of the model
+    :param sample_every: only record every `sample_every`-th time step in the outputs, defaults to 1
+    :type sample_every: int, optional
+    :param boldModel: integrate the BOLD model along with the model, only its samples are recorded,
+        defaults to None
+    :type boldModel: `neurolib.models.bold.BOLDModel`, optional
+    :return: Integrated activity variables of the model, the first `startind` columns of the
+        activity arrays contain the last state, followed by the recorded time steps
     :rtype: (numpy.ndarray,)
     """
+    # the nodes are integrated in parallel on `n_threads` threads
+    n_threads = params.get("n_threads", 1)
+    return batch.integrate(
+        timeIntegration_njit_elementwise, timeIntegration_args(params, sample_every, boldModel), n_threads
+    )
+
+
+def timeIntegration_args(params, sample_every=1, boldModel=None):
+    """Sets up the parameters for time integration and returns the arguments of
+    `timeIntegration_njit_elementwise`
+
+    :param params: Parameter dictionary of the model
+    :type params: dict
+    :param sample_every: only record every `sample_every`-th time step in the outputs, defaults to 1
+    :type sample_every: int, optional
+    :param boldModel: integrate the BOLD model along with the model, only its samples are recorded,
+        defaults to None
+    :type boldModel: `neurolib.models.bold.BOLDModel`, optional
+    :return: Arguments of the integration kernel
+    :rtype: tuple
+    """
 
     dt = params["dt"]  # Time step for the Euler intergration (ms)
     duration = params["duration"]  # imulation duration (ms)
@@ -62,6 +91,9 @@ def timeIntegration(params):
         Dmat[np.eye(len(Dmat)) == 1] = np.zeros(len(Dmat))
     Dmat_ndt = np.around(Dmat / dt).astype(int)  # delay matrix in multiples of dt
     params["Dmat_ndt"] = Dmat_ndt
+
+    # if Cmat is sparse, only the nonzero afferent connections of every node are integrated
+    sparse_coupling, Cmat_indptr, Cmat_indices = sparse.afferents(Cmat)
     # ------------------------------------------------------------------------
     # Initialization
     # Floating point issue in np.arange() workaraound: use integers in np.arange()
@@ -79,10 +111,18 @@ def timeIntegration(params):
     exc_ext = params["exc_ext"]
     inh_ext = params["inh_ext"]
 
-    # state variable arrays, have length of t + startind
-    # they store initial conditions AND simulated data
-    excs = np.zeros((N, startind + len(t)))
-    inhs = np.zeros((N, startind + len(t)))
+    # number of recorded time steps
+    n_samples = (len(t) + sample_every - 1) // sample_every
+
+    # output arrays, the first startind columns will hold the last state
+    excs = np.zeros((N, startind + n_samples))
+    inhs = np.zeros((N, startind + n_samples))
+
+    # the history of the last startind + 1 time steps (needed for the delays) is kept in ring
+    # buffers, time step i is stored at index i % history_length
+    history_length = startind + 1
+    excs_hist = np.zeros((N, history_length))
+    inhs_hist = np.zeros((N, history_length))
 
     # ------------------------------------------------------------------------
     # Set initial values
@@ -99,21 +139,27 @@ def timeIntegration(params):
     exc_input_d = np.zeros(N)  # delayed input to exc
     inh_input_d = np.zeros(N)  # delayed input to inh (note used)
 
-    np.random.seed(RNGseed)
+    # the noise is drawn during the integration from counter-based random streams (one per node)
+    # that are indexed by the absolute time step, `noise_step` time steps were integrated before
+    noise_keys = rng.streamKeys(RNGseed, N)
+    noise_step = params.get("noise_step", 0)
 
-    # Save the noise in the activity array to save memory
-    excs[:, startind:] = np.random.standard_normal((N, len(t)))
-    inhs[:, startind:] = np.random.standard_normal((N, len(t)))
+    # the integration is aborted if the state is not finite or exploded, checked every `check_every` time steps
+    check_every = params["divergence_check_every"]
+    divergence_threshold = params["divergence_threshold"]
 
-    excs[:, :startind] = exc_init
-    inhs[:, :startind] = inh_init
+    excs_hist[:, :startind] = exc_init
+    inhs_hist[:, :startind] = inh_init
 
     noise_exc = np.zeros((N,))
     noise_inh = np.zeros((N,))
 
     # ------------------------------------------------------------------------
 
-    return timeIntegration_njit_elementwise(
+    # the BOLD model is integrated along with the model and only its samples are recorded
+    bold_every, bold_phase, bold_dt, bold_state, BOLD = bold.fusedArgs(boldModel, N, len(t))
+
+    return (
         startind,
         t,
         dt,
@@ -122,8 +168,23 @@ def timeIntegration(params):
         Cmat,
         K_gl,
         Dmat_ndt,
+        sparse_coupling,
+        Cmat_indptr,
+        Cmat_indices,
         excs,
         inhs,
+        excs_hist,
+        inhs_hist,
+        noise_keys,
+        noise_step,
+        sample_every,
+        check_every,
+        divergence_threshold,
+        bold_every,
+        bold_phase,
+        bold_dt,
+        bold_state,
+        BOLD,
         exc_input_d,
         inh_input_d,
         exc_ext,
@@ -149,7 +210,7 @@ def timeIntegration(params):
     )
 
 
-@numba.njit
+@numba.njit(nogil=True, cache=True)
 def timeIntegration_njit_elementwise(
     startind,
     t,
@@ -159,8 +220,23 @@ def timeIntegration_njit_elementwise(
     Cmat,
     K_gl,
     Dmat_ndt,
+    sparse_coupling,
+    Cmat_indptr,
+    Cmat_indices,
     excs,
     inhs,
+    excs_hist,
+    inhs_hist,
+    noise_keys,
+    noise_step,
+    sample_every,
+    check_every,
+    divergence_threshold,
+    bold_every,
+    bold_phase,
+    bold_dt,
+    bold_state,
+    BOLD,
     exc_input_d,
     inh_input_d,
     exc_ext,
@@ -192,31 +268,49 @@ def timeIntegration_njit_elementwise(
     def S_I(x):
         return 1.0 / (1.0 + np.exp(-a_inh * (x - mu_inh)))
 
+    # length of the ring buffers
+    n_hist = excs_hist.shape[1]
+    # index of the next recorded time step in the outputs
+    s = startind
+    # index of the next BOLD sample
+    s_bold = 0
+
+    # index after the last integrated time step
+    i_end = startind + len(t)
+
     for i in range(startind, startind + len(t)):
 
+        # index of the current time step in the ring buffers, the delayed time steps j - d - 1 < 0
+        # wrap around to the end of the ring buffers
+        j = i % n_hist
+
         # loop through all the nodes
-        for no in range(N):
+        for no in numba.prange(N):
 
-            # To save memory, noise is saved in the activity array
-            noise_exc[no] = excs[no, i]
-            noise_inh[no] = inhs[no, i]
+            # noise of the current time step
+            noise_exc[no], noise_inh[no] = rng.normals(noise_keys[no], noise_step + i - startind)
 
             # delayed input to each node
             exc_input_d[no] = 0
 
-            for l in range(N):
-                exc_input_d[no] += K_gl * Cmat[no, l] * (excs[l, i - Dmat_ndt[no, l] - 1])
+            if sparse_coupling:
+                for k in range(Cmat_indptr[no], Cmat_indptr[no + 1]):
+                    l = Cmat_indices[k]
+                    exc_input_d[no] += K_gl * Cmat[no, l] * (excs_hist[l, j - Dmat_ndt[no, l] - 1])
+            else:
+                for l in range(N):
+                    exc_input_d[no] += K_gl * Cmat[no, l] * (excs_hist[l, j - Dmat_ndt[no, l] - 1])
 
             # Wilson-Cowan model
             exc_rhs = (
                 1
                 / tau_exc
                 * (
-                    -excs[no, i - 1]
-                    + (1 - excs[no, i - 1])
+                    -excs_hist[no, j - 1]
+                    + (1 - excs_hist[no, j - 1])
                     * S_E(
-                        c_excexc * excs[no, i - 1]  # input from within the excitatory population
-                        - c_inhexc * inhs[no, i - 1]  # input from the inhibitory population
+                        c_excexc * excs_hist[no, j - 1]  # input from within the excitatory population
+                        - c_inhexc * inhs_hist[no, j - 1]  # input from the inhibitory population
                         + exc_input_d[no]  # input from other nodes
                         + exc_ext
                     )  # external input
@@ -227,11 +321,11 @@ def timeIntegration_njit_elementwise(
                 1
                 / tau_inh
                 * (
-                    -inhs[no, i - 1]
-                    + (1 - inhs[no, i - 1])
+                    -inhs_hist[no, j - 1]
+                    + (1 - inhs_hist[no, j - 1])
                     * S_I(
-                        c_excinh * excs[no, i - 1]  # input from the excitatory population
-                        - c_inhinh * inhs[no, i - 1]  # input from within the inhibitory population
+                        c_excinh * excs_hist[no, j - 1]  # input from the excitatory population
+                        - c_inhinh * inhs_hist[no, j - 1]  # input from within the inhibitory population
                         + inh_ext
                     )  # external input
                     + inh_ou[no]  # ou noise
@@ -239,8 +333,8 @@ def timeIntegration_njit_elementwise(
             )
 
             # Euler integration
-            excs[no, i] = excs[no, i - 1] + dt * exc_rhs
-            inhs[no, i] = inhs[no, i - 1] + dt * inh_rhs
+            excs_hist[no, j] = excs_hist[no, j - 1] + dt * exc_rhs
+            inhs_hist[no, j] = inhs_hist[no, j - 1] + dt * inh_rhs
 
             # Ornstein-Uhlenbeck process
             exc_ou[no] = (
@@ -250,4 +344,37 @@ def timeIntegration_njit_elementwise(
                 inh_ou[no] + (inh_ou_mean - inh_ou[no]) * dt / tau_ou + sigma_ou * sqrt_dt * noise_inh[no]
             )  # mV/ms
 
-    return t, excs, inhs, exc_ou, inh_ou
+            # the BOLD model of the node is driven by its default output
+            if bold_every > 0:
+                bold.balloonWindkesselStep(bold_state, no, excs_hist[no, j], bold_dt)
+
+        # only record every sample_every-th time step
+        if (i - startind) % sample_every == 0:
+            excs[:, s] = excs_hist[:, j]
+            inhs[:, s] = inhs_hist[:, j]
+            s += 1
+
+        # record the BOLD signal every bold_every-th time step
+        if bold_every > 0 and (bold_phase + i - startind) % bold_every == 0:
+            for no in range(N):
+                BOLD[no, s_bold] = bold.boldSignal(bold_state, no)
+            s_bold += 1
+
+        # abort the integration if the state diverged, the remaining outputs are nan
+        if check_every > 0 and (i - startind) % check_every == 0:
+            if not (
+                np.all(np.abs(excs_hist[:, j]) <= divergence_threshold)
+                and np.all(np.abs(inhs_hist[:, j]) <= divergence_threshold)
+            ):
+                excs[:, s:] = np.nan
+                inhs[:, s:] = np.nan
+                BOLD[:, s_bold:] = np.nan
+                i_end = i + 1
+                break
+
+    # the last startind time steps are the initial state of the next run
+    for k in range(startind):
+        excs[:, k] = excs_hist[:, (i_end - startind + k) % n_hist]
+        inhs[:, k] = inhs_hist[:, (i_end - startind + k) % n_hist]
+
+    return t, excs, inhs, exc_ou, inh_ou, BOLD, bold_state
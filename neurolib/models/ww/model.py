@@ -30,6 +30,12 @@ class WWModel(Model):
     state_vars = ["r_exc", "r_inh", "se", "si", "exc_ou", "inh_ou"]
     output_vars = ["r_exc", "r_inh", "se", "si"]
     default_output = "r_exc"
+    # the integration only records every `sample_every`-th time step
+    integrationSubsampling = True
+    # the noise is drawn from counter-based random streams during the integration
+    counterNoise = True
+    # the BOLD model can be integrated along with the model
+    integrationBold = True
 
     def __init__(self, params=None, Cmat=None, Dmat=None, seed=None):
 
@@ -39,6 +45,9 @@ class WWModel(Model):
 
         # the integration function must be passed
         integration = ti.timeIntegration
+        # arguments and kernel of the integration for batched runs
+        self.integrationArgs = ti.timeIntegration_args
+        self.integrationKernel = ti.timeIntegration_njit_elementwise
 
         # load default parameters if none were given
         if params is None:
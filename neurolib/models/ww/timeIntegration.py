@@ -2,16 +2,45 @@ import numpy as np
 import numba
 
 from . import loadDefaultParams as dp
+from ..bold import timeIntegration as bold
+from ...utils import batch, rng, sparse
 
 
-def timeIntegration(params):
-    """Sets up the parameters for time integration
+def timeIntegration(params, sample_every=1, boldModel=None):
+    """Sets up the parameters for time integration and integrates the model
 
     :param params: Parameter dictionary of the model
     :type params: dict
-    :return: Integrated activity variables of the model
+    :param sample_every: only record every `sample_every`-th time step in the outputs, defaults to 1
+    :type sample_every: int, optional
+    :param boldModel: integrate the BOLD model along with the model, only its samples are recorded,
+        defaults to None
+    :type boldModel: `neurolib.models.bold.BOLDModel`, optional
+    :return: Integrated activity variables of the model, the first `startind` columns of the
+        activity arrays contain the last state, followed by the recorded time steps
     :rtype: (numpy.ndarray,)
     """
+    # the nodes are integrated in parallel on `n_threads` threads
+    n_threads = params.get("n_threads", 1)
+    return batch.integrate(
+        timeIntegration_njit_elementwise, timeIntegration_args(params, sample_every, boldModel), n_threads
+    )
+
+
+def timeIntegration_args(params, sample_every=1, boldModel=None):
+    """Sets up the parameters for time integration and returns the arguments of
+    `timeIntegration_njit_elementwise`
+
+    :param params: Parameter dictionary of the model
+    :type params: dict
+    :param sample_every: only record every `sample_every`-th time step in the outputs, defaults to 1
+    :type sample_every: int, optional
+    :param boldModel: integrate the BOLD model along with the model, only its samples are recorded,
+        defaults to None
+    :type boldModel: `neurolib.models.bold.BOLDModel`, optional
+    :return: Arguments of the integration kernel
+    :rtype: tuple
+    """
 
     dt = params["dt"]  # Time step for the Euler intergration (ms)
     duration = params["duration"]  # imulation duration (ms)
@@ -69,6 +98,9 @@ def timeIntegration(params):
     Dmat_ndt = np.around(Dmat / dt).astype(int)  # delay matrix in multiples of dt
     params["Dmat_ndt"] = Dmat_ndt
 
+    # if Cmat is sparse, only the nonzero afferent connections of every node are integrated
+    sparse_coupling, Cmat_indptr, Cmat_indices = sparse.afferents(Cmat)
+
     # # Additive or diffusive coupling scheme
     # version = params["version"]
     # # convert to integer for faster integration later
@@ -94,14 +126,24 @@ def timeIntegration(params):
     exc_ou = params["exc_ou"]
     inh_ou = params["inh_ou"]
 
-    # state variable arrays, have length of t + startind
-    # they store initial conditions AND simulated data
-    ses = np.zeros((N, startind + len(t)))
-    sis = np.zeros((N, startind + len(t)))
+    # number of recorded time steps
+    n_samples = (len(t) + sample_every - 1) // sample_every
+
+    # output arrays, the first startind columns will hold the last state
+    ses = np.zeros((N, startind + n_samples))
+    sis = np.zeros((N, startind + n_samples))
+
+    # the history of the last startind + 1 time steps (needed for the delays) is kept in ring
+    # buffers, time step i is stored at index i % history_length
+    history_length = startind + 1
+    ses_hist = np.zeros((N, history_length))
+    sis_hist = np.zeros((N, history_length))
 
     # holds firing rates
-    r_exc = np.zeros((N, startind + len(t)))
-    r_inh = np.zeros((N, startind + len(t)))
+    r_exc = np.zeros((N, startind + n_samples))
+    r_inh = np.zeros((N, startind + n_samples))
+    r_exc_hist = np.zeros((N, history_length))
+    r_inh_hist = np.zeros((N, history_length))
 
     # ------------------------------------------------------------------------
     # Set initial values
@@ -117,21 +159,27 @@ def timeIntegration(params):
     # xsd = np.zeros((N,N))  # delayed activity
     ses_input_d = np.zeros(N)  # delayed input to x
 
-    np.random.seed(RNGseed)
+    # the noise is drawn during the integration from counter-based random streams (one per node)
+    # that are indexed by the absolute time step, `noise_step` time steps were integrated before
+    noise_keys = rng.streamKeys(RNGseed, N)
+    noise_step = params.get("noise_step", 0)
 
-    # Save the noise in the activity array to save memory
-    ses[:, startind:] = np.random.standard_normal((N, len(t)))
-    sis[:, startind:] = np.random.standard_normal((N, len(t)))
+    # the integration is aborted if the state is not finite or exploded, checked every `check_every` time steps
+    check_every = params["divergence_check_every"]
+    divergence_threshold = params["divergence_threshold"]
 
-    ses[:, :startind] = ses_init
-    sis[:, :startind] = sis_init
+    ses_hist[:, :startind] = ses_init
+    sis_hist[:, :startind] = sis_init
 
     noise_se = np.zeros((N,))
     noise_si = np.zeros((N,))
 
     # ------------------------------------------------------------------------
 
-    return timeIntegration_njit_elementwise(
+    # the BOLD model is integrated along with the model and only its samples are recorded
+    bold_every, bold_phase, bold_dt, bold_state, BOLD = bold.fusedArgs(boldModel, N, len(t))
+
+    return (
         startind,
         t,
         dt,
@@ -143,8 +191,23 @@ def timeIntegration(params):
         K_gl,
         signalV,
         Dmat_ndt,
+        sparse_coupling,
+        Cmat_indptr,
+        Cmat_indices,
         ses,
         sis,
+        ses_hist,
+        sis_hist,
+        noise_keys,
+        noise_step,
+        sample_every,
+        check_every,
+        divergence_threshold,
+        bold_every,
+        bold_phase,
+        bold_dt,
+        bold_state,
+        BOLD,
         ses_input_d,
         a_exc,
         b_exc,
@@ -164,6 +227,8 @@ def timeIntegration(params):
         w_ee,
         r_exc,
         r_inh,
+        r_exc_hist,
+        r_inh_hist,
         noise_se,
         noise_si,
         exc_ou,
@@ -175,7 +240,7 @@ def timeIntegration(params):
     )
 
 
-@numba.njit
+@numba.njit(nogil=True, cache=True)
 def timeIntegration_njit_elementwise(
     startind,
     t,
@@ -188,8 +253,23 @@ def timeIntegration_njit_elementwise(
     K_gl,
     signalV,
     Dmat_ndt,
+    sparse_coupling,
+    Cmat_indptr,
+    Cmat_indices,
     ses,
     sis,
+    ses_hist,
+    sis_hist,
+    noise_keys,
+    noise_step,
+    sample_every,
+    check_every,
+    divergence_threshold,
+    bold_every,
+    bold_phase,
+    bold_dt,
+    bold_state,
+    BOLD,
     ses_input_d,
     a_exc,
     b_exc,
@@ -209,6 +289,8 @@ def timeIntegration_njit_elementwise(
     w_ee,
     r_exc,
     r_inh,
+    r_exc_hist,
+    r_inh_hist,
     noise_se,
     noise_si,
     exc_ou,
@@ -238,38 +320,56 @@ def timeIntegration_njit_elementwise(
         return (a * I - b) / (1.0 - np.exp(-d * (a * I - b)))
 
     ### integrate ODE system:
+    # length of the ring buffers
+    n_hist = ses_hist.shape[1]
+    # index of the next recorded time step in the outputs
+    s = startind
+    # index of the next BOLD sample
+    s_bold = 0
+
+    # index after the last integrated time step
+    i_end = startind + len(t)
+
     for i in range(startind, startind + len(t)):
 
+        # index of the current time step in the ring buffers, the delayed time steps j - d - 1 < 0
+        # wrap around to the end of the ring buffers
+        j = i % n_hist
+
         # loop through all the nodes
-        for no in range(N):
+        for no in numba.prange(N):
 
-            # To save memory, noise is saved in the activity array
-            noise_se[no] = ses[no, i]
-            noise_si[no] = sis[no, i]
+            # noise of the current time step
+            noise_se[no], noise_si[no] = rng.normals(noise_keys[no], noise_step + i - startind)
 
             # delayed input to each node
             ses_input_d[no] = 0
 
             # input from other nodes
-            for l in range(N):
-                ses_input_d[no] += K_gl * Cmat[no, l] * (ses[l, i - Dmat_ndt[no, l] - 1])
+            if sparse_coupling:
+                for k in range(Cmat_indptr[no], Cmat_indptr[no + 1]):
+                    l = Cmat_indices[k]
+                    ses_input_d[no] += K_gl * Cmat[no, l] * (ses_hist[l, j - Dmat_ndt[no, l] - 1])
+            else:
+                for l in range(N):
+                    ses_input_d[no] += K_gl * Cmat[no, l] * (ses_hist[l, j - Dmat_ndt[no, l] - 1])
 
             # Wong-Wang
-            se = ses[no, i - 1]
-            si = sis[no, i - 1]
+            se = ses_hist[no, j - 1]
+            si = sis_hist[no, j - 1]
 
             I_exc = w_exc * exc_current + w_ee * J_NMDA * se - J_I * si + J_NMDA * ses_input_d[no]
             I_inh = w_inh * inh_current + J_NMDA * se - si
 
-            r_exc[no, i] = r(I_exc, a_exc, b_exc, d_exc)
-            r_inh[no, i] = r(I_inh, a_inh, b_inh, d_inh)
+            r_exc_hist[no, j] = r(I_exc, a_exc, b_exc, d_exc)
+            r_inh_hist[no, j] = r(I_inh, a_inh, b_inh, d_inh)
 
-            se_rhs = -(se / tau_exc) + (1 - se) * gamma_exc * r_exc[no, i] + exc_ou[no]  # exc_ou = ou noise
-            si_rhs = -(si / tau_inh) + r_inh[no, i] + inh_ou[no]
+            se_rhs = -(se / tau_exc) + (1 - se) * gamma_exc * r_exc_hist[no, j] + exc_ou[no]  # exc_ou = ou noise
+            si_rhs = -(si / tau_inh) + r_inh_hist[no, j] + inh_ou[no]
 
             # Euler integration
-            ses[no, i] = ses[no, i - 1] + dt * se_rhs
-            sis[no, i] = sis[no, i - 1] + dt * si_rhs
+            ses_hist[no, j] = ses_hist[no, j - 1] + dt * se_rhs
+            sis_hist[no, j] = sis_hist[no, j - 1] + dt * si_rhs
 
             # Ornstein-Uhlenberg process
             exc_ou[no] = (
@@ -279,4 +379,43 @@ def timeIntegration_njit_elementwise(
                 inh_ou[no] + (inh_ou_mean - inh_ou[no]) * dt / tau_ou + sigma_ou * sqrt_dt * noise_si[no]
             )  # mV/ms
 
-    return t, r_exc, r_inh, ses, sis, exc_ou, inh_ou
+            # the BOLD model of the node is driven by its default output
+            if bold_every > 0:
+                bold.balloonWindkesselStep(bold_state, no, r_exc_hist[no, j], bold_dt)
+
+        # only record every sample_every-th time step
+        if (i - startind) % sample_every == 0:
+            ses[:, s] = ses_hist[:, j]
+            sis[:, s] = sis_hist[:, j]
+            r_exc[:, s] = r_exc_hist[:, j]
+            r_inh[:, s] = r_inh_hist[:, j]
+            s += 1
+
+        # record the BOLD signal every bold_every-th time step
+        if bold_every > 0 and (bold_phase + i - startind) % bold_every == 0:
+            for no in range(N):
+                BOLD[no, s_bold] = bold.boldSignal(bold_state, no)
+            s_bold += 1
+
+        # abort the integration if the state diverged, the remaining outputs are nan
+        if check_every > 0 and (i - startind) % check_every == 0:
+            if not (
+                np.all(np.abs(r_exc_hist[:, j]) <= divergence_threshold)
+                and np.all(np.abs(r_inh_hist[:, j]) <= divergence_threshold)
+            ):
+                ses[:, s:] = np.nan
+                sis[:, s:] = np.nan
+                r_exc[:, s:] = np.nan
+                r_inh[:, s:] = np.nan
+                BOLD[:, s_bold:] = np.nan
+                i_end = i + 1
+                break
+
+    # the last startind time steps are the initial state of the next run
+    for k in range(startind):
+        ses[:, k] = ses_hist[:, (i_end - startind + k) % n_hist]
+        sis[:, k] = sis_hist[:, (i_end - startind + k) % n_hist]
+        r_exc[:, k] = r_exc_hist[:, (i_end - startind + k) % n_hist]
+        r_inh[:, k] = r_inh_hist[:, (i_end - startind + k) % n_hist]
+
+    return t, r_exc, r_inh, ses, sis, exc_ou, inh_ou, BOLD, bold_state
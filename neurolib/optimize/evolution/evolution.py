@@ -415,10 +415,14 @@ class Evolution:
 
         def _worker(arg, fn):
             """
-            Wrapper to get original exception from inner, `fn`, function.
+            Wrapper to get original exception from inner, `fn`, function. Also returns the
+            `run_status` of the model, which is set if `fn` runs the model.
             """
             try:
-                return fn(arg)
+                if self.model is None:
+                    return fn(arg), None
+                self.model.run_status = None
+                return fn(arg), self.model.run_status
             except Exception as e:
                 logging.exception(e)
                 raise
@@ -489,7 +493,7 @@ class Evolution:
         assert len(evolutionResult) > 0, "No results returned from simulations."
 
         for idx, result in enumerate(evolutionResult):
-            runIndex, packedReturnFromEvalFunction = result
+            runIndex, (packedReturnFromEvalFunction, runStatus) = result
 
             # packedReturnFromEvalFunction is the return from the evaluation function
             # it has length two, the first is the fitness, second is the model output
@@ -501,6 +505,8 @@ class Evolution:
 
             # store simulation outputs
             pop[idx].outputs = returnedOutputs
+            # "ok" or "diverged" if the model was run
+            pop[idx].run_status = runStatus
 
             # store fitness values
             pop[idx].fitness.values = fitnessesResult
@@ -824,6 +830,8 @@ class Evolution:
                             df.loc[i, key] = value
                     else:
                         df.loc[i, key] = nan_value
+            if getattr(p, "run_status", None) is not None:
+                df.loc[i, "run_status"] = p.run_status
         return df
 
     def _dropDuplicatesFromDf(self, df):
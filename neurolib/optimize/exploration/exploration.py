@@ -7,10 +7,6 @@ import pathlib
 
 import numpy as np
 import pandas as pd
-import psutil
-import pypet
-import tqdm
-import xarray as xr
 
 from ...utils import paths
 from ...utils import pypetUtils as pu
@@ -101,6 +97,8 @@ class BoxSearch:
         :param filename: hdf filename to store the results in , defaults to "exploration.hdf"
         :type filename: str, optional
         """
+        import pypet
+
         # create hdf file path if it does not exist yet
         pathlib.Path(paths.HDF_DIR).mkdir(parents=True, exist_ok=True)
 
@@ -236,8 +234,13 @@ class BoxSearch:
             runKwargs = self.runKwargs
         # run it
         self.model.run(**runKwargs)
-        # save outputs
-        self._saveModelOutputsToPypet(traj)
+        # save outputs, if reducers were used, only their results are saved
+        if runKwargs.get("reducers"):
+            self.saveToPypet(self.model.reductions, traj)
+        else:
+            self._saveModelOutputsToPypet(traj)
+        # "ok" or "diverged"
+        self.saveToPypet({"run_status": self.model.run_status}, traj)
 
     def _saveModelOutputsToPypet(self, traj):
         # save all data to the pypet trajectory
@@ -305,7 +308,8 @@ class BoxSearch:
 
     def run(self, **kwargs):
         """
-        Call this function to run the exploration
+        Call this function to run the exploration. All keyword arguments are passed to `Model.run()`. If `reducers`
+        are passed, only the results of the reducers are saved instead of the model outputs.
         """
         self.runKwargs = kwargs
         assert self.initialized, "Pypet environment not initialized yet."
@@ -332,6 +336,8 @@ class BoxSearch:
             at 95% use, defaults to 95
         :type memory_cap: float, int, optional
         """
+        import psutil
+        import tqdm
 
         self.loadDfResults(filename, trajectoryName)
 
@@ -383,10 +389,12 @@ class BoxSearch:
             to False
         :type fillna: bool, optional
         """
+        import tqdm
+
         nan_value = np.nan
         # defines which variable types will be saved in the results dataframe
-        SUPPORTED_TYPES = (float, int, np.ndarray, list)
-        SCALAR_TYPES = (float, int)
+        SUPPORTED_TYPES = (float, int, str, np.ndarray, list)
+        SCALAR_TYPES = (float, int, str)
         ARRAY_TYPES = (np.ndarray, list)
 
         logging.info("Aggregating results to `dfResults` ...")
@@ -479,6 +487,8 @@ class BoxSearch:
         """
         run_dict = copy.deepcopy(run_dict)
         run_dict = self._filterDictionaryBold(run_dict, bold=bold)
+        # only arrays are outputs, e.g. `run_status` is not
+        run_dict = {k: v for k, v in run_dict.items() if isinstance(v, np.ndarray)}
         timeDictKey = ""
         if "t" in run_dict:
             timeDictKey = "t"
@@ -504,6 +514,7 @@ class BoxSearch:
         :param bold: if True, will load and return only BOLD output
         :type bold: bool
         """
+        import xarray as xr
 
         def _sanitize_nc_key(k):
             return k.replace("*", "_").replace(".", "_").replace("|", "_")
@@ -520,7 +531,7 @@ class BoxSearch:
             outputs = []
             run_result = self._filterDictionaryBold(run_result, bold=bold)
             for key, value in run_result.items():
-                if key == timeDictKey:
+                if key == timeDictKey or not isinstance(value, np.ndarray):
                     continue
                 outputs.append(value)
             # create DataArray for run only - we need to add exploration coordinates
@@ -0,0 +1,170 @@
+"""
+Batched integration: many parameter sets of a model are integrated in a single call of a
+compiled batch kernel that loops (optionally in parallel) over the integration kernel of the model,
+or on a pool of threads that call the integration kernel (which releases the GIL) concurrently.
+
+A single simulation can be integrated with the node-parallel variant of an integration kernel,
+in which the loops over the nodes (`numba.prange`) are distributed on the threads of numba.
+"""
+
+import ast
+import inspect
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+
+import numba
+import numpy as np
+
+# compiled batch kernels, keyed by kernel, batched arguments and parallelization
+_batchKernels = {}
+# compiled node-parallel variants, keyed by kernel
+_parallelKernels = {}
+
+
+def kernelOutputs(kernel):
+    """Returns the positions of the arguments of an integration kernel that are returned by it.
+    All values returned by the kernel must be arguments of the kernel.
+
+    :param kernel: numba compiled integration kernel
+    :type kernel: `numba.core.registry.CPUDispatcher`
+    :return: positions of the returned arguments
+    :rtype: list[int]
+    """
+    func = ast.parse(textwrap.dedent(inspect.getsource(kernel.py_func))).body[0]
+    argnames = [arg.arg for arg in func.args.args]
+    returned = func.body[-1]
+    assert isinstance(returned, ast.Return), f"{func.name} must end with a return statement."
+    names = returned.value.elts if isinstance(returned.value, ast.Tuple) else [returned.value]
+    assert all(
+        isinstance(n, ast.Name) and n.id in argnames for n in names
+    ), f"{func.name} can only return its arguments."
+    return [argnames.index(n.id) for n in names]
+
+
+def getBatchKernel(kernel, batched, parallel=True):
+    """Compiles a batch kernel that calls `kernel` for every entry along the first axis of the
+    batched arguments.
+
+    :param kernel: numba compiled integration kernel
+    :type kernel: `numba.core.registry.CPUDispatcher`
+    :param batched: for every argument, whether it is batched (True) or shared by all entries (False)
+    :type batched: tuple[bool]
+    :param parallel: loop over the batch in parallel, defaults to True
+    :type parallel: bool, optional
+    :return: batch kernel with the signature `batchKernel(B, *args)`
+    :rtype: `numba.core.registry.CPUDispatcher`
+    """
+    key = (kernel, batched, parallel)
+    if key not in _batchKernels:
+        argnames = [f"a{k}" for k in range(len(batched))]
+        call = ", ".join(f"{a}[b]" if isBatched else a for a, isBatched in zip(argnames, batched))
+        source = f"def batchKernel(B, {', '.join(argnames)}):\n    for b in numba.prange(B):\n        kernel({call})\n"
+        namespace = {"numba": numba, "kernel": kernel}
+        exec(source, namespace)
+        _batchKernels[key] = numba.njit(parallel=parallel)(namespace["batchKernel"])
+    return _batchKernels[key]
+
+
+def integrateBatch(kernel, argsList, parallel=True):
+    """Integrates a batch of argument tuples of an integration kernel in a single call.
+
+    Arguments that are the same object (or the same scalar) in every argument tuple are shared by
+    the whole batch, all other arguments are stacked along a new first axis. Shared arrays must
+    therefore not be written by the kernel.
+
+    :param kernel: numba compiled integration kernel
+    :type kernel: `numba.core.registry.CPUDispatcher`
+    :param argsList: arguments of the kernel for every entry of the batch
+    :type argsList: list[tuple]
+    :param parallel: integrate the batch in parallel, defaults to True
+    :type parallel: bool, optional
+    :return: values returned by the kernel, batched along the first axis unless they are shared
+    :rtype: tuple
+    """
+    assert len(argsList) > 0, "Batch is empty."
+    args = []
+    batched = []
+    for values in zip(*argsList):
+        first = values[0]
+        shared = all(v is first for v in values) or (
+            np.isscalar(first) and all(np.isscalar(v) and v == first for v in values)
+        )
+        if shared:
+            args.append(first)
+            batched.append(False)
+        else:
+            shapes = {np.shape(v) for v in values}
+            if len(shapes) > 1:
+                raise ValueError(
+                    f"All parameter sets of a batch must lead to arrays of the same shape, got {sorted(shapes)}."
+                )
+            args.append(np.stack(values) if isinstance(first, np.ndarray) else np.array(values))
+            batched.append(True)
+
+    batchKernel = getBatchKernel(kernel, tuple(batched), parallel)
+    batchKernel(len(argsList), *args)
+    return tuple(args[k] for k in kernelOutputs(kernel))
+
+
+def integrateThreaded(kernel, argsList, n_threads=None):
+    """Integrates a batch of argument tuples of an integration kernel on a pool of threads. The kernel
+    must be compiled with `nogil=True`. Arrays that are shared by the argument tuples are not copied.
+
+    :param kernel: numba compiled integration kernel
+    :type kernel: `numba.core.registry.CPUDispatcher`
+    :param argsList: arguments of the kernel for every entry of the batch
+    :type argsList: list[tuple]
+    :param n_threads: number of threads, defaults to the number of CPUs
+    :type n_threads: int, optional
+    :return: values returned by the kernel, stacked along the first axis
+    :rtype: tuple
+    """
+    assert len(argsList) > 0, "Batch is empty."
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        results = list(executor.map(lambda args: kernel(*args), argsList))
+    return tuple(
+        np.stack(values) if isinstance(values[0], np.ndarray) else np.array(values) for values in zip(*results)
+    )
+
+
+def getParallelKernel(kernel):
+    """Compiles the node-parallel variant of an integration kernel, in which the loops over
+    `numba.prange` are parallelized. In the serial kernel, `numba.prange` is the same as `range`.
+
+    :param kernel: numba compiled integration kernel
+    :type kernel: `numba.core.registry.CPUDispatcher`
+    :return: node-parallel kernel with the same signature
+    :rtype: `numba.core.registry.CPUDispatcher`
+    """
+    if kernel not in _parallelKernels:
+        options = dict(kernel.targetoptions, parallel=True)
+        _parallelKernels[kernel] = numba.jit(locals=kernel.locals, **options)(kernel.py_func)
+    return _parallelKernels[kernel]
+
+
+def integrate(kernel, args, n_threads=1):
+    """Integrates a single simulation, with the node-parallel variant of the kernel if `n_threads > 1`.
+    The nodes are independent within a time step, so the results are identical to the serial kernel.
+
+    Every time step of the node-parallel kernel starts and joins the threads, which costs a few
+    microseconds. It only pays off for large networks, for which a time step of the serial kernel
+    takes much longer, i.e. from roughly 200 nodes for the ALN model and 500 nodes for the simpler
+    models (or less with a dense connectivity, whose coupling loops scale with N^2).
+
+    :param kernel: numba compiled integration kernel
+    :type kernel: `numba.core.registry.CPUDispatcher`
+    :param args: arguments of the kernel
+    :type args: tuple
+    :param n_threads: number of threads, at most `numba.config.NUMBA_NUM_THREADS`, defaults to 1
+    :type n_threads: int, optional
+    :return: values returned by the kernel
+    :rtype: tuple
+    """
+    if n_threads is None or n_threads <= 1:
+        return kernel(*args)
+    previous = numba.get_num_threads()
+    numba.set_num_threads(min(n_threads, numba.config.NUMBA_NUM_THREADS))
+    try:
+        return getParallelKernel(kernel)(*args)
+    finally:
+        numba.set_num_threads(previous)
@@ -6,6 +6,7 @@ import random
 import string
 from collections.abc import MutableMapping
 
+import numpy as np
 from dpath.util import delete, search
 
 DEFAULT_STAR_SEPARATOR = "."
@@ -117,6 +118,69 @@ class star_dotdict(dotdict):
             dict.__delitem__(self, attr)
 
 
+class GrowableArray:
+    """
+    Preallocated array that grows along its last (time) axis. Appending data
+    is amortized O(1) per sample since the capacity of the underlying buffer
+    is doubled whenever it is exhausted, instead of copying all previous data
+    on every append like `np.hstack` does.
+
+    Example:
+
+    ```
+    buffer = GrowableArray(np.zeros((80, 1000)), capacity=100000)
+    buffer.append(np.ones((80, 1000)))
+    buffer.data.shape  # (80, 2000), view on the buffer
+    ```
+    """
+
+    def __init__(self, data, capacity=None):
+        """
+        :param data: initial data, time is the last axis
+        :type data: np.ndarray
+        :param capacity: number of samples to preallocate along the last axis, will be at least the length of `data`
+        :type capacity: int, optional
+        """
+        data = np.asarray(data)
+        assert data.ndim > 0, "Data must have a time axis."
+        length = data.shape[-1]
+        capacity = max(int(capacity or 0), length, 1)
+        self._buffer = np.empty(data.shape[:-1] + (capacity,), dtype=data.dtype)
+        self._buffer[..., :length] = data
+        self.length = length
+        self.data = self._buffer[..., : self.length]
+
+    @property
+    def capacity(self):
+        return self._buffer.shape[-1]
+
+    def _grow(self, min_capacity):
+        capacity = max(2 * self.capacity, min_capacity)
+        buffer = np.empty(self._buffer.shape[:-1] + (capacity,), dtype=self._buffer.dtype)
+        buffer[..., : self.length] = self._buffer[..., : self.length]
+        self._buffer = buffer
+
+    def append(self, data):
+        """Append data along the last axis.
+
+        :param data: data to append, all but the last axis must match the shape of the buffer
+        :type data: np.ndarray
+        :return: view on all data in the buffer
+        :rtype: np.ndarray
+        """
+        data = np.asarray(data)
+        assert (
+            data.shape[:-1] == self._buffer.shape[:-1]
+        ), f"Can't append data of shape {data.shape} to buffer of shape {self.data.shape}."
+        n = data.shape[-1]
+        if self.length + n > self.capacity:
+            self._grow(self.length + n)
+        self._buffer[..., self.length : self.length + n] = data
+        self.length += n
+        self.data = self._buffer[..., : self.length]
+        return self.data
+
+
 def _sanitize_keys(key, replace_dict):
     if replace_dict:
         for k, v in replace_dict.items():
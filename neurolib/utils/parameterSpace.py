@@ -5,7 +5,6 @@ Class for representing a parameter space for exploration or optimization.
 from collections import namedtuple
 
 import numpy as np
-import pypet
 
 from ..utils.collections import sanitize_dot_dict
 
@@ -97,6 +96,8 @@ class ParameterSpace:
             # just return as dict
             return self.parameters
         elif self.kind == "grid":
+            import pypet
+
             # cartesian product
             return pypet.cartesian_product(self.parameters)
         elif self.kind == "sequence":
@@ -1,5 +1,3 @@
-import h5py
-import pypet
 import pathlib
 import logging
 import copy
@@ -17,6 +15,8 @@ def getTrajectorynamesInFile(filename):
     :return: List of strings containing the trajectory names
     :rtype: list[str]
     """
+    import h5py
+
     assert pathlib.Path(filename).exists(), f"{filename} does not exist!"
     hdf = h5py.File(filename, "r")
     all_traj_names = list(hdf.keys())
@@ -32,6 +32,8 @@ def loadPypetTrajectory(filename, trajectoryName):
 
     :return: pypet trajectory
     """
+    import pypet
+
     assert pathlib.Path(filename).exists(), f"{filename} does not exist!"
     logging.info(f"Loading results from {filename}")
 
@@ -0,0 +1,241 @@
+"""
+Online reducers that fold model outputs into summary statistics while they are simulated.
+
+When reducers are passed to `Model.run()`, every output chunk is handed to the
+reducers that are attached to this output. The results are available in
+`model.reductions` after the run. Together with a chunkwise simulation, summary
+statistics of long simulations can be computed without ever keeping the full
+timeseries in memory.
+
+Example:
+
+```
+model.run(chunkwise=True, reducers=[RunningFC(), RunningMoments("rates_inh"), WelchAccumulator(maxfr=40)])
+model.reductions.fc_rates_exc
+```
+"""
+
+import logging
+
+import numpy as np
+import scipy.signal
+
+from .collections import dotdict
+
+
+class Reducer:
+    """
+    Base class for reducers. A reducer is attached to a single output of the model
+    (the default output if none is given). Dot.separated output names like
+    `"BOLD.BOLD"` refer to output groups.
+    """
+
+    # short description of the reduction, used for the default name
+    kind = "reduction"
+
+    def __init__(self, output=None, name=None):
+        """
+        :param output: name of the output to reduce, defaults to the default output of the model
+        :type output: str, optional
+        :param name: name of the result in `model.reductions`, defaults to `<kind>_<output>`
+        :type name: str, optional
+        """
+        self.output = output
+        self.name = name
+        self.initialized = False
+
+    def reset(self, model):
+        """Resets all accumulators, called by the model before a new run.
+
+        :param model: model whose outputs are reduced
+        :type model: `neurolib.models.model.Model`
+        """
+        self.outputName = self.output or model.default_output
+        if self.name is None:
+            self.name = f"{self.kind}_{self.outputName.replace('.', '_')}"
+        # sampling time step of the reduced output in ms
+        if self.outputName.startswith("BOLD") and getattr(model, "boldInitialized", False):
+            self.dt = model.boldModel.samplingRate_NDt * model.boldModel.dt
+        else:
+            self.dt = model.params.get("sampling_dt") or model.params["dt"]
+        self._reset()
+        self.initialized = True
+
+    def update(self, data):
+        """Fold a new chunk of the output into the accumulators.
+
+        :param data: output chunk of shape (N, t)
+        :type data: numpy.ndarray
+        """
+        raise NotImplementedError
+
+    def result(self):
+        """Result of the reduction of all chunks so far.
+
+        :rtype: numpy.ndarray or dict
+        """
+        raise NotImplementedError
+
+    def _reset(self):
+        pass
+
+
+class RunningMoments(Reducer):
+    """
+    Running mean and variance of every node, chunks are combined with the parallel
+    algorithm of Chan et al. The variance is the population variance, like `np.var()`.
+    """
+
+    kind = "moments"
+
+    def _reset(self):
+        self.n = 0
+        self.mean = None
+        self.m2 = None
+
+    def update(self, data):
+        data = np.asarray(data, dtype=float)
+        n = data.shape[-1]
+        if n == 0:
+            return
+        mean = data.mean(axis=-1)
+        m2 = ((data - mean[..., np.newaxis]) ** 2).sum(axis=-1)
+        if self.n == 0:
+            self.n, self.mean, self.m2 = n, mean, m2
+        else:
+            total = self.n + n
+            delta = mean - self.mean
+            self.mean = self.mean + delta * n / total
+            self.m2 = self.m2 + m2 + delta ** 2 * self.n * n / total
+            self.n = total
+
+    def result(self):
+        """
+        :return: mean and variance of every node
+        :rtype: dict
+        """
+        return dotdict({"mean": self.mean, "var": self.m2 / self.n if self.n > 0 else None})
+
+
+class RunningFC(Reducer):
+    """
+    Running functional connectivity (Pearson correlation between all nodes), equal to
+    `neurolib.utils.functions.fc()` of the full timeseries.
+    """
+
+    kind = "fc"
+
+    def _reset(self):
+        self.n = 0
+        self.mean = None
+        self.comoment = None
+
+    def update(self, data):
+        data = np.asarray(data, dtype=float)
+        n = data.shape[-1]
+        if n == 0:
+            return
+        mean = data.mean(axis=-1)
+        centered = data - mean[:, np.newaxis]
+        comoment = centered @ centered.T
+        if self.n == 0:
+            self.n, self.mean, self.comoment = n, mean, comoment
+        else:
+            total = self.n + n
+            delta = mean - self.mean
+            self.mean = self.mean + delta * n / total
+            self.comoment = self.comoment + comoment + np.outer(delta, delta) * self.n * n / total
+            self.n = total
+
+    def result(self):
+        """
+        :return: N x N functional connectivity matrix
+        :rtype: numpy.ndarray
+        """
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fc = self.comoment / np.outer(std, std)
+        return np.nan_to_num(np.clip(fc, -1, 1))
+
+
+class WelchAccumulator(Reducer):
+    """
+    Power spectrum of every node using Welch's method (Hann window, 50% overlap), equal to
+    `neurolib.utils.functions.getPowerSpectrum()` of the full timeseries. Only the samples
+    of the last incomplete segment are kept between chunks.
+    """
+
+    kind = "power"
+
+    def __init__(self, output=None, name=None, maxfr=70, spectrum_windowsize=1.0, band=None, normalize=False):
+        """
+        :param maxfr: Maximum frequency in Hz to cutoff from the result, defaults to 70
+        :type maxfr: int, optional
+        :param spectrum_windowsize: Length of the window used in Welch's method (in seconds), defaults to 1.0
+        :type spectrum_windowsize: float, optional
+        :param band: Frequency band (low, high) in Hz, if given, the summed power in the band is returned as well,
+            defaults to None
+        :type band: tuple, optional
+        :param normalize: Maximum power is normalized to 1 if True, defaults to False
+        :type normalize: bool, optional
+        """
+        super().__init__(output=output, name=name)
+        self.maxfr = maxfr
+        self.spectrum_windowsize = spectrum_windowsize
+        self.band = band
+        self.normalize = normalize
+
+    def _reset(self):
+        self.nperseg = int(self.spectrum_windowsize * 1000 / self.dt)
+        self.step = self.nperseg - self.nperseg // 2
+        self.segments = 0
+        self.powers = None
+        self.f = None
+        self.buffer = None
+
+    def update(self, data):
+        data = np.asarray(data, dtype=float)
+        self.buffer = data if self.buffer is None else np.concatenate((self.buffer, data), axis=-1)
+        length = self.buffer.shape[-1]
+        if length < self.nperseg:
+            return
+        # number of complete segments in the buffer
+        segments = (length - self.nperseg) // self.step + 1
+        f, Pxx_spec = scipy.signal.welch(
+            self.buffer[:, : self.nperseg + (segments - 1) * self.step],
+            1000 / self.dt,
+            window="hann",
+            nperseg=self.nperseg,
+            scaling="spectrum",
+            axis=-1,
+        )
+        # welch averages over the segments, we keep the sum
+        Pxx_spec = Pxx_spec * segments
+        self.powers = Pxx_spec if self.powers is None else self.powers + Pxx_spec
+        self.f = f
+        self.segments += segments
+        self.buffer = self.buffer[:, segments * self.step :].copy()
+
+    def result(self):
+        """
+        :return: frequencies `f`, the power of every node `power` (N x f), the mean power of all nodes
+            `mean_power` and, if a band was given, the summed power in the band of every node `band_power`
+        :rtype: dict
+        """
+        if self.segments == 0:
+            logging.warning(
+                f"Output `{self.outputName}` shorter than the spectrum window of {self.spectrum_windowsize} s, "
+                "no power spectrum computed."
+            )
+            return dotdict({})
+        mask = self.f < self.maxfr
+        power = self.powers[:, mask] / self.segments
+        mean_power = power.mean(axis=0)
+        if self.normalize:
+            power = power / np.max(power, axis=1, keepdims=True)
+            mean_power = mean_power / np.max(mean_power)
+        result = dotdict({"f": self.f[mask], "power": power, "mean_power": mean_power})
+        if self.band is not None:
+            inband = (self.f[mask] >= self.band[0]) & (self.f[mask] < self.band[1])
+            result["band_power"] = power[:, inband].sum(axis=1)
+        return result
@@ -0,0 +1,76 @@
+"""
+Counter-based random numbers for the integration kernels.
+
+Every node has its own random stream, derived from the seed of the simulation. The random
+numbers of a time step are a pure function of the stream and the (absolute) index of the
+time step, so no noise arrays have to be generated before the integration, the noise does
+not depend on how a simulation is split into chunks and the streams of the nodes can be
+drawn in any order (or in parallel).
+
+The streams are based on the splitmix64 generator: the n-th number of a stream with key k
+is mix64(k + n * GOLDEN_GAMMA), which can be computed for any n directly.
+"""
+
+import numba
+import numpy as np
+
+# increment of the splitmix64 generator
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+# 2**-53, converts 53 random bits into a float in [0, 1)
+FLOAT_SCALE = 1.0 / 9007199254740992.0
+
+
+@numba.njit(nogil=True, cache=True)
+def mix64(z):
+    """splitmix64 finalizer, a bijective hash of a 64 bit integer.
+
+    :param z: integer to hash
+    :type z: numpy.uint64
+    :rtype: numpy.uint64
+    """
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+@numba.njit(nogil=True, cache=True)
+def normals(key, step):
+    """Two independent standard normal random numbers of time step `step` of the stream `key`,
+    using the Box-Muller transform.
+
+    :param key: key of the random stream
+    :type key: numpy.uint64
+    :param step: absolute index of the time step
+    :type step: int
+    :return: two standard normal random numbers
+    :rtype: (float, float)
+    """
+    counter = key + np.uint64(2) * np.uint64(step) * GOLDEN_GAMMA
+    # u1 is in (0, 1] to avoid log(0)
+    u1 = (np.float64(mix64(counter + GOLDEN_GAMMA) >> np.uint64(11)) + 1.0) * FLOAT_SCALE
+    u2 = np.float64(mix64(counter + np.uint64(2) * GOLDEN_GAMMA) >> np.uint64(11)) * FLOAT_SCALE
+    r = np.sqrt(-2.0 * np.log(u1))
+    return r * np.cos(2.0 * np.pi * u2), r * np.sin(2.0 * np.pi * u2)
+
+
+def streamKeys(seed, n):
+    """Keys of `n` random streams (e.g. one per node) derived from a seed. If the seed is None,
+    fresh entropy from the operating system is used.
+
+    :param seed: seed of the simulation
+    :type seed: int or None
+    :param n: number of streams
+    :type n: int
+    :return: keys of the streams
+    :rtype: numpy.ndarray
+    """
+    key = np.random.SeedSequence(None if seed is None else int(seed)).generate_state(1, dtype=np.uint64)[0]
+    return _streamKeys(key, n)
+
+
+@numba.njit(cache=True)
+def _streamKeys(key, n):
+    keys = np.empty(n, dtype=np.uint64)
+    for s in range(n):
+        keys[s] = mix64(key + np.uint64(s + 1) * GOLDEN_GAMMA)
+    return keys
@@ -8,7 +8,6 @@ from functools import partial
 
 import numpy as np
 import xarray as xr
-from ..models.model import Model
 from scipy.signal import butter, detrend, get_window, hilbert
 from scipy.signal import resample as scipy_resample
 from scipy.signal import sosfiltfilt
@@ -81,6 +80,8 @@ class Signal:
         """
         Initial Signal from modelling output.
         """
+        from ..models.model import Model
+
         assert isinstance(model, Model)
         return cls(model.xr(group=group), time_in_ms=time_in_ms)
 
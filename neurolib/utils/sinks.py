@@ -0,0 +1,234 @@
+"""
+Output sinks for streaming model outputs while they are simulated.
+
+When a sink is passed to `Model.run()`, every output chunk is handed to the
+sink as soon as it is produced and `model.outputs` only holds the last chunk.
+The peak memory of a long chunkwise simulation is therefore bounded by the
+chunk size instead of the duration of the simulation.
+
+Example:
+
+```
+model.run(chunkwise=True, bold=True, sink=HDF5Sink("long_run.h5"))
+```
+"""
+
+import os
+
+import h5py
+import numpy as np
+
+from .collections import GrowableArray
+
+
+class Sink:
+    """
+    Base class for output sinks. Outputs are identified by their (dot.separated)
+    name, e.g. `"rates_exc"` or `"BOLD.BOLD"`, and data is always appended along
+    the last (time) axis.
+    """
+
+    def __init__(self):
+        self.isOpen = False
+        # only the first run truncates previously written outputs
+        self.initialized = False
+
+    def open(self, model=None):
+        """Called by the model before the simulation starts.
+
+        :param model: model that writes into the sink
+        :type model: `neurolib.models.model.Model`, optional
+        """
+        if not self.initialized:
+            self._init()
+            self.initialized = True
+        self.isOpen = True
+
+    def write(self, name, data):
+        """Append `data` of the output `name` along its last axis.
+
+        :param name: name of the output
+        :type name: str
+        :param data: output data
+        :type data: numpy.ndarray
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Called by the model after the simulation finished."""
+        self.isOpen = False
+
+    def _init(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class MemorySink(Sink):
+    """
+    Keeps all outputs in memory, using growable buffers. Mostly useful for testing
+    and for collecting outputs of several consecutive runs.
+    """
+
+    def _init(self):
+        self.buffers = {}
+
+    def write(self, name, data):
+        if name in self.buffers:
+            self.buffers[name].append(data)
+        else:
+            self.buffers[name] = GrowableArray(data)
+
+    def __getitem__(self, name):
+        return self.buffers[name].data
+
+    def __contains__(self, name):
+        return name in self.buffers
+
+    @property
+    def outputs(self):
+        """All outputs written to the sink.
+
+        :rtype: dict
+        """
+        return {name: buffer.data for name, buffer in self.buffers.items()}
+
+
+class HDF5Sink(Sink):
+    """
+    Writes outputs into resizable datasets of a HDF5 file. Output groups (e.g.
+    `"BOLD.BOLD"`) are stored as HDF5 groups (`"BOLD/BOLD"`).
+    """
+
+    def __init__(self, filename, compression=None, chunk_samples=None):
+        """
+        :param filename: HDF5 file name
+        :type filename: str
+        :param compression: h5py compression filter, e.g. "gzip", defaults to None
+        :type compression: str, optional
+        :param chunk_samples: HDF5 chunk length along time, will be determined by h5py if left empty
+        :type chunk_samples: int, optional
+        """
+        super().__init__()
+        self.filename = filename
+        self.compression = compression
+        self.chunk_samples = chunk_samples
+        self.file = None
+
+    def open(self, model=None):
+        mode = "a" if self.initialized else "w"
+        super().open(model)
+        self.file = h5py.File(self.filename, mode)
+
+    def write(self, name, data):
+        assert self.file is not None, "Sink is not open."
+        data = np.asarray(data)
+        key = name.replace(".", "/")
+        if key not in self.file:
+            chunks = True if self.chunk_samples is None else data.shape[:-1] + (self.chunk_samples,)
+            self.file.create_dataset(
+                key,
+                data=data,
+                maxshape=data.shape[:-1] + (None,),
+                chunks=chunks,
+                compression=self.compression,
+            )
+        else:
+            dataset = self.file[key]
+            length = dataset.shape[-1]
+            dataset.resize(length + data.shape[-1], axis=data.ndim - 1)
+            dataset[..., length:] = data
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        super().close()
+
+    def load(self, name):
+        """Read an output from the HDF5 file.
+
+        :param name: name of the output
+        :type name: str
+        :rtype: numpy.ndarray
+        """
+        with h5py.File(self.filename, "r") as f:
+            return f[name.replace(".", "/")][()]
+
+
+class NpySink(Sink):
+    """
+    Writes every output into its own `.npy` file in a directory. The arrays are
+    stored in Fortran order, so that appending along time is a plain append to
+    the end of the file. The files can be opened memory-mapped with
+    `np.load(filename, mmap_mode="r")` or `NpySink.load()`.
+    """
+
+    # fixed length of the .npy header, so it can be rewritten with the final shape
+    HEADER_LENGTH = 128
+
+    def __init__(self, directory):
+        """
+        :param directory: directory to write the `.npy` files into, will be created if it does not exist
+        :type directory: str
+        """
+        super().__init__()
+        self.directory = directory
+        self.files = {}
+
+    def _init(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # shape and dtype of every output written so far
+        self.headers = {}
+
+    def filename(self, name):
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def _write_header(self, f, dtype, shape):
+        header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": True, "shape": shape})
+        # magic string (6), version (2) and header length (2) preceed the header
+        pad = self.HEADER_LENGTH - 10 - len(header) - 1
+        assert pad >= 0, f"Header of shape {shape} too long."
+        f.seek(0)
+        f.write(np.lib.format.magic(1, 0))
+        f.write(np.uint16(self.HEADER_LENGTH - 10).tobytes())
+        f.write((header + " " * pad + "\n").encode("latin1"))
+        f.seek(0, os.SEEK_END)
+
+    def write(self, name, data):
+        data = np.asarray(data)
+        if name not in self.headers:
+            self.headers[name] = (data.dtype, data.shape)
+            self.files[name] = open(self.filename(name), "wb+")
+            self._write_header(self.files[name], data.dtype, data.shape)
+        else:
+            dtype, shape = self.headers[name]
+            assert data.shape[:-1] == shape[:-1], f"Can't append data of shape {data.shape} to {shape}."
+            self.headers[name] = (dtype, shape[:-1] + (shape[-1] + data.shape[-1],))
+            if name not in self.files:
+                self.files[name] = open(self.filename(name), "rb+")
+                self.files[name].seek(0, os.SEEK_END)
+        self.files[name].write(np.asfortranarray(data, dtype=self.headers[name][0]).tobytes(order="F"))
+
+    def close(self):
+        for name, f in self.files.items():
+            self._write_header(f, *self.headers[name])
+            f.close()
+        self.files = {}
+        super().close()
+
+    def load(self, name, mmap_mode="r"):
+        """Load an output, memory-mapped by default.
+
+        :param name: name of the output
+        :type name: str
+        :param mmap_mode: memory-map mode passed to `np.load`, defaults to "r"
+        :type mmap_mode: str, optional
+        :rtype: numpy.ndarray
+        """
+        assert not self.isOpen, "Close the sink before loading outputs."
+        return np.load(self.filename(name), mmap_mode=mmap_mode)
@@ -0,0 +1,37 @@
+"""
+Sparse representation of the structural connectivity for the integration kernels.
+
+If the connectivity is sparse, the kernels only loop over the nonzero afferent connections of
+every node, which are given in compressed sparse row (CSR) format: the afferents of node `no`
+are `indices[indptr[no]:indptr[no + 1]]`. The weights and delays are still read from the dense
+`Cmat` and `Dmat_ndt`. Skipping a zero connection only skips adding zero to the input of a node,
+so the results of the integration do not change.
+"""
+
+import numpy as np
+
+# if less than this fraction of the connections is nonzero, the kernels use the sparse representation,
+# for denser matrices looping over all pairs of nodes is faster (the crossover is at a density of
+# 0.3-0.4 for the WC and ALN models with 300 nodes)
+SPARSE_DENSITY = 0.3
+
+
+def afferents(Cmat, max_density=None):
+    """Nonzero afferent connections of every node in compressed sparse row (CSR) format.
+
+    :param Cmat: connectivity matrix, Cmat(i, j) is the connection from the jth to the ith node
+    :type Cmat: numpy.ndarray
+    :param max_density: maximum density of `Cmat` for the sparse representation to be used, defaults
+        to `SPARSE_DENSITY`
+    :type max_density: float, optional
+    :return: whether the sparse representation should be used, row pointers and column indices of the
+        afferent connections
+    :rtype: (bool, numpy.ndarray, numpy.ndarray)
+    """
+    if max_density is None:
+        max_density = SPARSE_DENSITY
+    mask = np.asarray(Cmat) != 0
+    indptr = np.zeros(len(mask) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(mask.sum(axis=1))
+    indices = np.nonzero(mask)[1].astype(np.int64)
+    return bool(mask.mean() < max_density), indptr, indices
@@ -7,9 +7,7 @@ import logging
 
 import numba
 import numpy as np
-from chspy import CubicHermiteSpline
 from ..models.model import Model
-from scipy.signal import square
 
 
 class Input:
@@ -141,6 +139,8 @@ class Input:
         :param shift_start_time: By how much to shift the stimulus start time
         :type shift_start_time: float
         """
+        from chspy import CubicHermiteSpline
+
         self._get_times(duration, dt)
         splines = CubicHermiteSpline.from_data(self.times + shift_start_time, self.generate_input(duration, dt).T)
         self._reset()
@@ -424,7 +424,7 @@ class OrnsteinUhlenbeckProcess(Input):
         return self.numba_ou(x, self.times, dt, self.mu, self.sigma, self.tau, self.n)
 
     @staticmethod
-    @numba.njit()
+    @numba.njit(cache=True)
     def numba_ou(x, times, dt, mu, sigma, tau, n):
         """
         Generation of Ornstein-Uhlenback input - wrapped in numba's jit for
@@ -542,6 +542,8 @@ class SquareInput(Stimulus):
         )
 
     def generate_input(self, duration, dt):
+        from scipy.signal import square
+
         self._get_times(duration=duration, dt=dt)
         square_inp = self.amplitude * square(2 * np.pi * self.times * (self.frequency / 1000.0))
         if self.dc_bias:
@@ -0,0 +1,82 @@
+"""
+Ahead-of-time compilation of the numba kernels.
+
+The integration kernels, the BOLD kernel and the Ornstein-Uhlenbeck input are compiled with
+`cache=True`: the compiled machine code is written to the `__pycache__` directories next to the
+source files (or to `NUMBA_CACHE_DIR`, if the package directory is not writable) and loaded by
+every later process, e.g. by the workers of an exploration, instead of being compiled again.
+Calling `warmup()` once, for example when building a container image or at the start of a job,
+compiles and caches all kernels, so that the first simulation of every process only has to load them.
+The node-parallel and batch kernels (see `neurolib.utils.batch`) are compiled when they are first
+used in a process and are not cached.
+"""
+
+import inspect
+import logging
+import time
+
+import numpy as np
+
+
+def _modelClasses():
+    from ..models.aln import ALNModel
+    from ..models.fhn import FHNModel
+    from ..models.hopf import HopfModel
+    from ..models.thalamus import ThalamicMassModel
+    from ..models.wc import WCModel
+    from ..models.ww import WWModel
+
+    return [ALNModel, FHNModel, HopfModel, ThalamicMassModel, WCModel, WWModel]
+
+
+def warmup(models=None, bold=True, stimulus=True):
+    """Compiles (or loads from the cache) the numba kernels of the given models by running a very
+    short simulation of each of them.
+
+    :param models: models to compile, given as model classes or by their names (e.g. `"aln"`),
+        defaults to all models with a numba integration kernel
+    :type models: list, optional
+    :param bold: compile the BOLD kernel, defaults to True
+    :type bold: bool, optional
+    :param stimulus: compile the Ornstein-Uhlenbeck input, defaults to True
+    :type stimulus: bool, optional
+    :return: time in seconds it took to compile (or load) the kernels, keyed by name
+    :rtype: dict
+    """
+    classes = {model.name: model for model in _modelClasses()}
+    if models is None:
+        models = list(classes.values())
+    unknown = [model for model in models if isinstance(model, str) and model not in classes]
+    assert len(unknown) == 0, f"Unknown models {unknown}, available are {list(classes)}."
+    models = [classes[model] if isinstance(model, str) else model for model in models]
+
+    timings = {}
+    for model_class in models:
+        t0 = time.time()
+        # the arguments of a single node and of a network can have a different memory layout
+        networks = [False, True] if "Cmat" in inspect.signature(model_class).parameters else [False]
+        for network in networks:
+            model = model_class(Cmat=np.ones((2, 2)), Dmat=np.zeros((2, 2))) if network else model_class()
+            model.params["duration"] = 10 * model.params["dt"]
+            model.run()
+            model.run(chunkwise=True, chunksize=5)
+        timings[model_class.name] = time.time() - t0
+
+    if bold:
+        from ..models.bold.timeIntegration import simulateBOLD
+
+        t0 = time.time()
+        ones = np.ones((1,))
+        simulateBOLD(np.zeros((1, 1)), 1e-4, 10000 * ones, X=ones, F=ones, Q=ones, V=ones)
+        timings["bold"] = time.time() - t0
+
+    if stimulus:
+        from .stimulus import OrnsteinUhlenbeckProcess
+
+        t0 = time.time()
+        OrnsteinUhlenbeckProcess(mu=0.0, sigma=0.0, tau=1.0).generate_input(duration=1.0, dt=0.1)
+        timings["ou"] = time.time() - t0
+
+    for name, seconds in timings.items():
+        logging.info(f"Compiled {name} kernels in {seconds:.2f} s")
+    return timings
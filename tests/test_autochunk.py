@@ -136,6 +136,33 @@ class TestThalamusAutochunk(AutochunkTests):
         self.single_node_test(ThalamicMassModel)
 
 
+class TestNoisyAutochunk(unittest.TestCase):
+    """
+    The noise is drawn from counter-based random streams, so chunkwise runs with noise must be
+    identical to a single run with the same seed.
+    """
+
+    def test_noisy_network(self):
+        ds = Dataset("hcp")
+        for model in [ALNModel, FHNModel, HopfModel, WCModel, WWModel]:
+            m1 = model(Cmat=ds.Cmat, Dmat=ds.Dmat)
+            m1.params["duration"] = 100
+            m1.params["sigma_ou"] = 0.1
+            m1.params["seed"] = 42
+            pars_bak = copy.deepcopy(m1.params)
+            m1.run()
+            m2 = model(Cmat=ds.Cmat, Dmat=ds.Dmat)
+            m2.params = copy.deepcopy(pars_bak)
+            m2.run(chunkwise=True, chunksize=77, append=True)
+            np.testing.assert_array_equal(m1.output, m2.output)
+            # a different seed leads to different noise
+            m3 = model(Cmat=ds.Cmat, Dmat=ds.Dmat)
+            m3.params = copy.deepcopy(pars_bak)
+            m3.params["seed"] = 43
+            m3.run()
+            self.assertFalse(np.array_equal(m1.output, m3.output))
+
+
 class ChunkziseImpliesChunksize(unittest.TestCase):
     """
     Simply test whether the model runs as expected when
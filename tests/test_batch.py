@@ -0,0 +1,75 @@
+import copy
+import unittest
+
+import numpy as np
+import pytest
+
+from neurolib.models.aln import ALNModel
+from neurolib.models.fhn import FHNModel
+from neurolib.models.hopf import HopfModel
+from neurolib.models.wc import WCModel
+from neurolib.models.ww import WWModel
+from neurolib.utils.loadData import Dataset
+
+
+class TestRunBatch(unittest.TestCase):
+    """
+    Batched runs must be identical to individual runs of every parameter set.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ds = Dataset("hcp")
+
+    def test_run_batch(self):
+        for model_class in [ALNModel, FHNModel, HopfModel, WCModel, WWModel]:
+            model = model_class(Cmat=self.ds.Cmat, Dmat=self.ds.Dmat)
+            model.params["duration"] = 200
+            model.params["sampling_dt"] = 1.0
+            params = copy.deepcopy(model.params)
+            param_list = [{"K_gl": K_gl, "seed": 42} for K_gl in [0.5, 1.0, 2.0]]
+            outputs = model.run_batch(param_list)
+            # the model is not changed by the batch
+            self.assertNotIn("t", model.outputs)
+
+            for b, p in enumerate(param_list):
+                reference = model_class(Cmat=self.ds.Cmat, Dmat=self.ds.Dmat)
+                reference.params = copy.deepcopy(params)
+                reference.params.update(p)
+                reference.run()
+                np.testing.assert_allclose(outputs["t"], reference.outputs["t"])
+                for name in reference.output_vars:
+                    self.assertEqual(outputs[name].shape[0], len(param_list))
+                    np.testing.assert_array_equal(outputs[name][b], reference.outputs[name])
+
+    def test_run_ensemble(self):
+        for model_class in [ALNModel, FHNModel]:
+            model = model_class(Cmat=self.ds.Cmat, Dmat=self.ds.Dmat)
+            model.params["duration"] = 200
+            model.params["sigma_ou"] = 0.1
+            params = copy.deepcopy(model.params)
+            seeds = [1, 2, 3]
+            outputs = model.run_ensemble(seeds, n_threads=2)
+
+            for b, seed in enumerate(seeds):
+                reference = model_class(Cmat=self.ds.Cmat, Dmat=self.ds.Dmat)
+                reference.params = copy.deepcopy(params)
+                reference.params["seed"] = seed
+                reference.run()
+                for name in reference.output_vars:
+                    np.testing.assert_array_equal(outputs[name][b], reference.outputs[name])
+            # different seeds lead to different realizations
+            self.assertFalse(np.array_equal(outputs[model.default_output][0], outputs[model.default_output][1]))
+
+    def test_run_batch_assertions(self):
+        model = FHNModel(Cmat=self.ds.Cmat, Dmat=self.ds.Dmat)
+        model.params["duration"] = 10
+        with pytest.raises(AssertionError):
+            model.run_batch([{"duration": 20}])
+        # different delays lead to different shapes of the history
+        with pytest.raises(ValueError):
+            model.run_batch([{"signalV": 10.0}, {"signalV": 20.0}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,14 @@
 import logging
 import unittest
 
+import numpy as np
+
 from neurolib.models.multimodel import MultiModel
 from neurolib.models.multimodel.builder.wilson_cowan import WilsonCowanNode
 from neurolib.utils.collections import (
     BACKWARD_REPLACE,
     FORWARD_REPLACE,
+    GrowableArray,
     _sanitize_keys,
     flat_dict_to_nested,
     flatten_nested_dict,
@@ -119,5 +122,32 @@ class TestCollections(unittest.TestCase):
         self.assertTrue("INFO:root:Key `*key_not_there` cannot be resolved." in cm.output[0])
 
 
+
+class TestGrowableArray(unittest.TestCase):
+    def test_append(self):
+        data = np.random.rand(3, 10)
+        buffer = GrowableArray(data[:, :4], capacity=5)
+        for i in range(4, 10, 2):
+            buffer.append(data[:, i : i + 2])
+        self.assertEqual(buffer.data.shape, data.shape)
+        self.assertGreaterEqual(buffer.capacity, 10)
+        np.testing.assert_equal(buffer.data, data)
+
+    def test_append_1d(self):
+        buffer = GrowableArray(np.arange(3.0))
+        capacities = set()
+        for i in range(100):
+            buffer.append(np.array([3.0 + i]))
+            capacities.add(buffer.capacity)
+        np.testing.assert_equal(buffer.data, np.arange(103.0))
+        # capacity is doubled, not grown by every append
+        self.assertLess(len(capacities), 10)
+
+    def test_shape_mismatch(self):
+        buffer = GrowableArray(np.zeros((2, 3)))
+        with self.assertRaises(AssertionError):
+            buffer.append(np.zeros((3, 3)))
+
+
 if __name__ == "__main__":
     unittest.main()
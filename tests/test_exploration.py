@@ -70,6 +70,7 @@ class TestExplorationSingleNode(unittest.TestCase):
         dataarray = search.xr()
         self.assertTrue(isinstance(dataarray, xr.DataArray))
         self.assertFalse(dataarray.attrs)
+        self.assertTrue((search.dfResults["run_status"] == "ok").all())
 
         for i in search.dfResults.index:
             search.dfResults.loc[i, "max_r"] = np.max(
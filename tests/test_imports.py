@@ -1,5 +1,10 @@
+import os
+import subprocess
+import sys
 import unittest
 
+import neurolib
+
 
 class TestImports(unittest.TestCase):
     @classmethod
@@ -44,5 +49,35 @@ class TestImports(unittest.TestCase):
         search = BoxSearch(evalFunction=(lambda f: f), parameterSpace=self.pars)
 
 
+class TestImportTime(unittest.TestCase):
+    """
+    Heavy optional dependencies are only imported when they are used.
+    """
+
+    def importInSubprocess(self, statement):
+        """Runs an import statement in a new interpreter, returns the time it took and the imported modules."""
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(neurolib.__file__)))
+        code = f"import sys, time; t0 = time.time(); {statement}; print(time.time() - t0); print(*sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        duration, modules = output.stdout.splitlines()[-2:]
+        return float(duration), set(modules.split())
+
+    def test_deferred_imports(self):
+        deferred = {
+            "from neurolib.models.wc import WCModel": ["xarray", "pypet", "chspy", "jitcdde", "sympy", "scipy.signal"],
+            "import neurolib.utils.stimulus": ["chspy", "jitcdde", "scipy.signal"],
+            "import neurolib.models.multimodel": ["sympy", "symengine", "jitcdde"],
+            "from neurolib.optimize.exploration import BoxSearch": ["pypet", "psutil", "tqdm", "xarray"],
+        }
+        for statement, modules in deferred.items():
+            duration, imported = self.importInSubprocess(statement)
+            self.assertEqual(imported.intersection(modules), set(), statement)
+
+    def test_model_import_time(self):
+        # generous bound, the import takes less than a second with a warm file system cache
+        duration, _ = self.importInSubprocess("from neurolib.models.wc import WCModel")
+        self.assertLess(duration, 5.0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,10 +1,12 @@
 import logging
 import time
 import unittest
+from unittest import mock
 
 import numpy as np
 import pytest
 import xarray as xr
+import neurolib
 from chspy import join
 from neurolib.models.aln import ALNModel
 from neurolib.models.fhn import FHNModel
@@ -13,7 +15,9 @@ from neurolib.models.multimodel import MultiModel
 from neurolib.models.multimodel.builder.fitzhugh_nagumo import FitzHughNagumoNetwork, FitzHughNagumoNode
 from neurolib.models.thalamus import ThalamicMassModel
 from neurolib.models.wc import WCModel
+from neurolib.models.wc import timeIntegration as wc_timeIntegration
 from neurolib.models.ww import WWModel
+from neurolib.utils import sparse
 from neurolib.utils.collections import star_dotdict
 from neurolib.utils.loadData import Dataset
 from neurolib.utils.stimulus import ZeroInput
@@ -212,6 +216,130 @@ class TestThalamus(unittest.TestCase):
         logging.info("\t > Done in {:.2f} s".format(end - start))
 
 
+class TestSparseCoupling(unittest.TestCase):
+    """
+    The integration with a sparse connectivity only loops over the nonzero connections.
+    """
+
+    def test_sparse_coupling(self):
+        ds = Dataset("hcp")
+        Cmat = ds.Cmat * (ds.Cmat > np.quantile(ds.Cmat, 0.9))
+        for model_class in [ALNModel, FHNModel, HopfModel, WCModel, WWModel]:
+            outputs = []
+            # all pairs of nodes and only the nonzero connections
+            for max_density in [0.0, 1.1]:
+                with mock.patch.object(sparse, "SPARSE_DENSITY", max_density):
+                    model = model_class(Cmat=Cmat, Dmat=ds.Dmat, seed=42)
+                    model.params["duration"] = 200
+                    model.params["sigma_ou"] = 0.01
+                    model.run()
+                outputs.append(model.outputs)
+            for name in model.output_vars:
+                np.testing.assert_array_equal(outputs[0][name], outputs[1][name])
+
+
+class TestParallelNodes(unittest.TestCase):
+    """
+    Integrating the nodes in parallel gives the same results as the serial integration.
+    """
+
+    def test_n_threads(self):
+        ds = Dataset("hcp")
+        for model_class in [ALNModel, FHNModel, HopfModel, WCModel, WWModel]:
+            outputs = []
+            for n_threads in [1, 2]:
+                model = model_class(Cmat=ds.Cmat, Dmat=ds.Dmat, seed=42)
+                model.params["duration"] = 200
+                model.params["sigma_ou"] = 0.01
+                model.params["n_threads"] = n_threads
+                model.run(chunkwise=True, chunksize=50)
+                outputs.append(model.outputs)
+            for name in model.output_vars:
+                np.testing.assert_array_equal(outputs[0][name], outputs[1][name])
+
+
+class TestWarmup(unittest.TestCase):
+    """
+    The kernels are compiled ahead of time.
+    """
+
+    def test_warmup(self):
+        timings = neurolib.warmup(models=[WCModel, "hopf"], bold=False, stimulus=False)
+        self.assertEqual(set(timings), {"wc", "hopf"})
+        self.assertGreater(len(wc_timeIntegration.timeIntegration_njit_elementwise.signatures), 0)
+
+        # the kernels are not compiled again
+        t0 = time.time()
+        neurolib.warmup(models=["wc"], bold=False, stimulus=False)
+        self.assertLess(time.time() - t0, 1.0)
+
+
+class TestFusedBold(unittest.TestCase):
+    """
+    The BOLD model that is integrated along with the model gives the same BOLD signal.
+    """
+
+    def test_fused_bold(self):
+        ds = Dataset("hcp")
+        for model_class in [ALNModel, FHNModel, HopfModel, WCModel, WWModel]:
+            outputs = []
+            for fused_bold in [False, True]:
+                model = model_class(Cmat=ds.Cmat, Dmat=ds.Dmat, seed=42)
+                model.params["duration"] = 6000
+                model.params["sigma_ou"] = 0.01
+                model.params["sampling_dt"] = 10.0
+                model.params["fused_bold"] = fused_bold
+                model.run(bold=True, chunkwise=True, append=True)
+                outputs.append(model.outputs)
+            self.assertEqual(outputs[1].BOLD.BOLD.shape, (80, 3))
+            np.testing.assert_array_equal(outputs[0].BOLD.t_BOLD, outputs[1].BOLD.t_BOLD)
+            np.testing.assert_array_equal(outputs[0].BOLD.BOLD, outputs[1].BOLD.BOLD)
+            for name in model.output_vars:
+                np.testing.assert_array_equal(outputs[0][name], outputs[1][name])
+
+
+class TestDivergence(unittest.TestCase):
+    """
+    The integration is aborted when the state of a model diverges.
+    """
+
+    def test_native_models(self):
+        for model_class in [ALNModel, FHNModel, HopfModel, WCModel, WWModel]:
+            model = model_class()
+            model.params["duration"] = 200
+            model.run()
+            self.assertEqual(model.run_status, "ok")
+            self.assertFalse(np.isnan(model.output).any())
+
+            # every state is larger than the threshold, the integration is aborted at the first check
+            model.params["divergence_threshold"] = 1e-10
+            model.params["divergence_check_every"] = 100
+            model.run()
+            self.assertEqual(model.run_status, "diverged")
+            self.assertEqual(model.output.shape[1], 2000)
+            self.assertFalse(np.isnan(model.output[:, 0]).any())
+            self.assertTrue(np.isnan(model.output[:, 1:]).all())
+
+            # every chunk is aborted at its first time step
+            model.run(chunkwise=True, chunksize=500, append=True)
+            self.assertEqual(model.run_status, "diverged")
+            self.assertEqual(model.output.shape[1], 2000)
+            for start in range(0, 2000, 500):
+                self.assertTrue(np.isnan(model.output[:, start + 1 : start + 500]).all())
+
+    def test_multimodel_numba(self):
+        fhn_net = FitzHughNagumoNetwork(np.random.rand(2, 2), np.zeros((2, 2)))
+        model = MultiModel(fhn_net)
+        model.params["backend"] = "numba"
+        model.params["duration"] = 200
+        model.params["divergence_threshold"] = 1e-10
+        model.params["divergence_check_every"] = 100
+        model.run()
+        self.assertEqual(model.run_status, "diverged")
+        self.assertFalse(np.isnan(model.output[:, :100]).any())
+        self.assertTrue(np.isnan(model.output[:, 100:]).all())
+
+
 class TestMultiModel(unittest.TestCase):
     """
     Basic test for MultiModel. Test with FitzHugh-Nagumo model.
@@ -0,0 +1,99 @@
+import copy
+import unittest
+
+import numpy as np
+import scipy.signal
+
+from neurolib.models.aln import ALNModel
+from neurolib.models.fhn import FHNModel
+from neurolib.optimize.exploration import BoxSearch
+from neurolib.utils.functions import fc
+from neurolib.utils.loadData import Dataset
+from neurolib.utils.parameterSpace import ParameterSpace
+from neurolib.utils.reducers import RunningFC, RunningMoments, WelchAccumulator
+
+
+class TestReducers(unittest.TestCase):
+    """
+    Reductions folded chunk by chunk must match the statistics of the full timeseries.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        ds = Dataset("hcp")
+        model = FHNModel(Cmat=ds.Cmat, Dmat=ds.Dmat)
+        model.params["duration"] = 10 * 1000
+        model.params["seed"] = 42
+        # same initial values for both models
+        reference = FHNModel(Cmat=ds.Cmat, Dmat=ds.Dmat)
+        reference.params = copy.deepcopy(model.params)
+        reference.run(chunkwise=True, chunksize=20000, bold=True, append=True)
+        cls.reference = reference
+        cls.model = model
+        cls.reducers = [
+            RunningFC(),
+            RunningFC("BOLD.BOLD"),
+            RunningMoments("y"),
+            WelchAccumulator(maxfr=40, spectrum_windowsize=0.5, band=(5, 15)),
+        ]
+        model.run(chunkwise=True, chunksize=20000, bold=True, reducers=cls.reducers)
+
+    def test_outputs_not_stored(self):
+        self.assertLess(self.model.output.shape[1], self.reference.output.shape[1])
+        self.assertListEqual(
+            list(self.model.reductions.keys()), ["fc_x", "fc_BOLD_BOLD", "moments_y", "power_x"],
+        )
+
+    def test_running_fc(self):
+        np.testing.assert_allclose(self.model.reductions.fc_x, fc(self.reference.x), atol=1e-10)
+        np.testing.assert_allclose(self.model.reductions.fc_BOLD_BOLD, fc(self.reference.BOLD.BOLD), atol=1e-10)
+
+    def test_running_moments(self):
+        moments = self.model.reductions.moments_y
+        np.testing.assert_allclose(moments.mean, self.reference.y.mean(axis=1), atol=1e-12)
+        np.testing.assert_allclose(moments.var, self.reference.y.var(axis=1), atol=1e-12)
+
+    def test_welch_accumulator(self):
+        dt = self.reference.params["dt"]
+        f, Pxx_spec = scipy.signal.welch(
+            self.reference.x, 1000 / dt, window="hann", nperseg=int(0.5 * 1000 / dt), scaling="spectrum", axis=-1
+        )
+        power = self.model.reductions.power_x
+        np.testing.assert_array_equal(power.f, f[f < 40])
+        np.testing.assert_allclose(power.power, Pxx_spec[:, f < 40], rtol=1e-8)
+        np.testing.assert_allclose(power.mean_power, Pxx_spec[:, f < 40].mean(axis=0), rtol=1e-8)
+        inband = (f >= 5) & (f < 15)
+        np.testing.assert_allclose(power.band_power, Pxx_spec[:, inband].sum(axis=1), rtol=1e-8)
+
+    def test_continue_run(self):
+        model = ALNModel()
+        model.params["duration"] = 1000
+        model.params["seed"] = 42
+        reference = ALNModel()
+        reference.params = copy.deepcopy(model.params)
+        reference.params["duration"] = 2000
+        reference.run()
+
+        reducer = RunningMoments()
+        model.run(continue_run=True, reducers=[reducer])
+        model.run(continue_run=True, reducers=[reducer])
+        moments = model.reductions.moments_rates_exc
+        np.testing.assert_allclose(moments.mean, reference.output.mean(axis=1))
+        np.testing.assert_allclose(moments.var, reference.output.var(axis=1))
+
+    def test_exploration(self):
+        model = FHNModel()
+        model.params["duration"] = 2000
+        parameters = ParameterSpace({"K_gl": [0.0, 1.0]})
+        search = BoxSearch(model, parameters, filename="test_reducers_exploration.hdf")
+        search.run(chunkwise=True, reducers=[RunningMoments(), WelchAccumulator()])
+        search.loadResults(pypetShortNames=False)
+        for i in search.dfResults.index:
+            result = search.results[i]
+            self.assertNotIn("x", result)
+            self.assertEqual(result["moments_x.mean"].shape, (1,))
+            self.assertEqual(result["power_x.power"].shape[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
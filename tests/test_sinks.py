@@ -0,0 +1,81 @@
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from neurolib.models.aln import ALNModel
+from neurolib.models.fhn import FHNModel
+from neurolib.utils.loadData import Dataset
+from neurolib.utils.sinks import HDF5Sink, MemorySink, NpySink
+
+
+class TestSinks(unittest.TestCase):
+    """
+    Outputs streamed to a sink must match the outputs of an in-memory chunkwise run.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ds = Dataset("hcp")
+        cls.tmpdir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def _run(self, sink):
+        """Returns the outputs of an in-memory run and a model that was run with a sink."""
+        model = FHNModel(Cmat=self.ds.Cmat, Dmat=self.ds.Dmat)
+        model.params["duration"] = 10 * 1000
+        model.params["seed"] = 42
+        # same initial values for both models
+        reference = FHNModel(Cmat=self.ds.Cmat, Dmat=self.ds.Dmat)
+        reference.params = copy.deepcopy(model.params)
+        reference.run(chunkwise=True, chunksize=20000, bold=True, append=True)
+        reference = {name: reference.getOutput(name) for name in ["t", "x", "y", "BOLD.t_BOLD", "BOLD.BOLD"]}
+        model.run(chunkwise=True, chunksize=20000, bold=True, sink=sink)
+        return reference, model
+
+    def test_memory_sink(self):
+        sink = MemorySink()
+        reference, model = self._run(sink)
+        # only the last chunk is kept in memory
+        self.assertLess(model.output.shape[1], reference["x"].shape[1])
+        for name in reference:
+            np.testing.assert_array_equal(sink[name], reference[name])
+
+    def test_hdf5_sink(self):
+        sink = HDF5Sink(os.path.join(self.tmpdir, "outputs.h5"))
+        reference, model = self._run(sink)
+        self.assertFalse(sink.isOpen)
+        for name in ["t", "x", "BOLD.BOLD"]:
+            np.testing.assert_array_equal(sink.load(name), reference[name])
+
+    def test_npy_sink(self):
+        sink = NpySink(os.path.join(self.tmpdir, "npy"))
+        reference, model = self._run(sink)
+        for name in ["t", "x", "BOLD.BOLD"]:
+            np.testing.assert_array_equal(sink.load(name), reference[name])
+
+    def test_continue_run(self):
+        model = ALNModel()
+        model.params["duration"] = 500
+        model.params["seed"] = 42
+        params = copy.deepcopy(model.params)
+        model.run()
+        model.run(continue_run=True, append=True)
+        t, rates_exc = model.t.copy(), model.rates_exc.copy()
+
+        model.params = params
+        sink = MemorySink()
+        model.run(sink=sink)
+        model.run(continue_run=True, sink=sink)
+        np.testing.assert_array_equal(sink["t"], t)
+        np.testing.assert_array_equal(sink["rates_exc"], rates_exc)
+
+
+if __name__ == "__main__":
+    unittest.main()
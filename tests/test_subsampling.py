@@ -4,6 +4,11 @@ import unittest
 
 import numpy as np
 from neurolib.models.aln import ALNModel
+from neurolib.models.fhn import FHNModel
+from neurolib.models.hopf import HopfModel
+from neurolib.models.wc import WCModel
+from neurolib.models.ww import WWModel
+from neurolib.utils.loadData import Dataset
 
 
 class TestSubsampling(unittest.TestCase):
@@ -62,6 +67,46 @@ class TestSubsampling(unittest.TestCase):
             (full_output[:, ::sample_every] == subsample_output).all()
         ), "Subsampling returned unexpected output values"
 
+    def test_subsample_integration(self):
+        """Outputs that are subsampled during the integration are equal to the subsampled full outputs."""
+        ds = Dataset("hcp")
+        for model_class in [ALNModel, FHNModel, HopfModel, WCModel, WWModel]:
+            model = model_class(Cmat=ds.Cmat, Dmat=ds.Dmat, seed=42)
+            model.params["duration"] = 100
+            model.params["sigma_ou"] = 0.1
+            model.params["seed"] = 42
+            # some integrations update the initial values of the noise in place
+            params = copy.deepcopy(model.params)
+            model.run()
+            full_outputs = {name: model[name].copy() for name in model.output_vars}
+            full_state = {name: np.array(value).copy() for name, value in model.state.items()}
+
+            model.params = params
+            model.params["sampling_dt"] = 1.0
+            model.run()
+            sample_every = int(model.params["sampling_dt"] / model.params["dt"])
+            for name in model.output_vars:
+                np.testing.assert_array_equal(model[name], full_outputs[name][:, ::sample_every])
+            np.testing.assert_allclose(model.t, np.arange(model.output.shape[1]) * model.params["sampling_dt"] + 0.1)
+            # the last state is still recorded at full resolution
+            for name, value in full_state.items():
+                np.testing.assert_array_equal(model.state[name], value)
+
+    def test_subsample_integration_bold(self):
+        """The BOLD model still receives the full resolution output."""
+        model = ALNModel(seed=42)
+        model.params["duration"] = 4000
+        model.run(bold=True)
+        full_bold = model.boldModel.BOLD.copy()
+        full_output = model.output.copy()
+
+        model = ALNModel(seed=42)
+        model.params["duration"] = 4000
+        model.params["sampling_dt"] = 1.0
+        model.run(bold=True)
+        np.testing.assert_array_equal(model.boldModel.BOLD, full_bold)
+        np.testing.assert_array_equal(model.output, full_output[:, ::10])
+
     def test_sampling_dt_smaller_than_dt(self):
         model = ALNModel()
         model.params["dt"] = 10  # 0.1 ms